@@ -0,0 +1,130 @@
+"""Calcul de la CAF en lot sur un dossier de balances, réparti sur tous les cœurs."""
+import argparse
+import importlib.util
+import sys
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from engine import CATEGORIES, classify_comptes, compute_from_totals, parse_centime, sum_by_category
+from ledger_io import iter_ledger_chunks, list_ledger_files
+from pools import run_jobs
+
+COLONNES = (
+    ['fichier', 'lignes', 'lignes_valides']
+    + CATEGORIES[1:]
+    + ['caf', 'dividendes', 'autofinancement', 'duree', 'erreur']
+)
+
+
+def file_totals(filepath):
+    # (lignes lues, lignes valides, totaux par catégorie en centimes)
+    # Lecture par blocs: la mémoire reste bornée quelle que soit la taille du fichier
+    lignes = lignes_valides = 0
+    totals = np.zeros(len(CATEGORIES), dtype=np.int64)
+    for chunk in iter_ledger_chunks(filepath):
+        lignes += chunk.attrs['lignes']
+        lignes_valides += len(chunk)
+        categories = classify_comptes(chunk['compte'].to_numpy())
+        totals += sum_by_category(categories, chunk['centimes'].to_numpy())
+    return lignes, lignes_valides, totals
+
+
+def load_totals(filepath):
+    # (lignes lues, totaux, '') ou (None, None, erreur)
+    # Ne lève jamais: l'erreur est renvoyée pour le fichier concerné
+    try:
+        lignes, _, totals = file_totals(filepath)
+        return lignes, totals, ''
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def process_file(filepath, dividendes=0):
+    # dividendes en centimes
+    # Ne lève jamais: une erreur est reportée dans la ligne du fichier concerné
+    ligne = {'fichier': filepath, 'erreur': ''}
+    debut = time.perf_counter()
+    try:
+        lignes, lignes_valides, totals = file_totals(filepath)
+        ligne['lignes'] = lignes
+        ligne['lignes_valides'] = lignes_valides
+        ligne.update(compute_from_totals(totals, dividendes))
+    except Exception as e:
+        ligne['erreur'] = f"{type(e).__name__}: {e}"
+    ligne['duree'] = time.perf_counter() - debut
+    return ligne
+
+
+def run_batch(fichiers, dividendes=0, workers=None, progress=None):
+    lignes = dict(run_jobs(
+        process_file, [(f, (f, dividendes)) for f in fichiers], workers, progress,
+        echec=lambda filepath, erreur: {'fichier': filepath, 'erreur': erreur},
+    ))
+
+    resume = pd.DataFrame([lignes[f] for f in fichiers], columns=COLONNES)
+    resume['erreur'] = resume['erreur'].fillna('')
+    return resume.astype({'lignes': 'Int64', 'lignes_valides': 'Int64'})
+
+
+def check_output(output):
+    # Avant tout calcul: sans moteur Parquet, l'écriture finale échouerait après tout le lot
+    if output.lower().endswith('.parquet') and not any(
+        importlib.util.find_spec(moteur) for moteur in ('pyarrow', 'fastparquet')
+    ):
+        raise ValueError(
+            f"Sortie Parquet impossible ({output}): installez pyarrow (pip install pyarrow) "
+            "ou choisissez une sortie .csv"
+        )
+
+
+def write_summary(resume, output):
+    if output.lower().endswith('.parquet'):
+        resume.to_parquet(output, index=False)
+    else:
+        resume.to_csv(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcul de la CAF en lot sur des fichiers Excel/CSV")
+    parser.add_argument('entrees', nargs='+', help="Dossiers, fichiers ou motifs glob (*.xlsx, *.xls, *.csv)")
+    parser.add_argument('-o', '--output', default='resume_caf.csv', help="Fichier de synthèse (.csv ou .parquet)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus (défaut: tous les cœurs)")
+    parser.add_argument('--dividendes', type=parse_centime, default=0, help="Dividendes (compte 457) appliqués à chaque fichier")
+    args = parser.parse_args(argv)
+
+    try:
+        check_output(args.output)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    fichiers = list_ledger_files(args.entrees)
+    if not fichiers:
+        print("Aucun fichier .xlsx/.xls/.csv trouvé", file=sys.stderr)
+        return 1
+
+    def progress(fait, total):
+        print(f"\r{fait}/{total} fichiers traités", end='', file=sys.stderr)
+
+    debut = time.perf_counter()
+    try:
+        resume = run_batch(fichiers, args.dividendes, args.workers, progress)
+        write_summary(resume, args.output)
+    except Exception:
+        print(f"\nErreur complète:\n{traceback.format_exc()}", file=sys.stderr)
+        return 1
+
+    erreurs = int((resume['erreur'] != '').sum())
+    print(
+        f"\n{len(fichiers)} fichiers en {time.perf_counter() - debut:.1f} s "
+        f"({erreurs} en erreur) -> {args.output}",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
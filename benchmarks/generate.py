@@ -0,0 +1,124 @@
+"""Générateurs reproductibles de grands livres PCN synthétiques (classes 1 à 7)."""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Comptes courants hors tableau de CAF, par classe
+COMPTES_COURANTS = {
+    '1': ['101', '106', '108', '110', '164', '168'],
+    '2': ['204', '211', '213', '215', '218', '281', '291'],
+    '3': ['30', '31', '32', '35', '37', '39'],
+    '4': ['401', '404', '411', '421', '431', '444', '445', '457', '467'],
+    '5': ['512', '517', '53', '58'],
+    '6': ['60', '61', '62', '63', '64', '65', '66', '69'],
+    '7': ['70', '72', '73', '74', '75', '76'],
+}
+
+# Comptes alimentant la CAF et leur poids relatif parmi eux
+COMPTES_CAF = {
+    '12': 1, '681': 4, '686': 1, '687': 1,
+    '781': 2, '786': 1, '787': 1,
+    '675': 1, '775': 1, '777': 1,
+}
+
+LIBELLES = [
+    "Achat marchandises", "Vente produits finis", "Loyer siège", "Salaires",
+    "Dotation amortissements", "Reprise provision", "Cession véhicule",
+    "Subvention d'équipement", "Facture fournisseur", "Règlement client",
+    "Frais bancaires", "Impôts et taxes", "Résultat de l'exercice",
+]
+
+TAILLES = [1_000, 10_000, 100_000, 1_000_000, 5_000_000]
+LIGNES_MAX_XLSX = 1_048_575
+
+
+def generate_ledger(n, seed=0, part_caf=0.2):
+    # part_caf: proportion de lignes sur les comptes 12/68x/78x/675/775/777
+    rng = np.random.default_rng(seed)
+
+    courants = [c for comptes in COMPTES_COURANTS.values() for c in comptes]
+    caf = list(COMPTES_CAF)
+    poids = np.array(list(COMPTES_CAF.values()), dtype=np.float64)
+
+    est_caf = rng.random(n) < part_caf
+    racines = np.where(
+        est_caf,
+        np.array(caf)[rng.choice(len(caf), n, p=poids / poids.sum())],
+        np.array(courants)[rng.integers(0, len(courants), n)],
+    )
+
+    # Sous-comptes sur six chiffres (ex. 681 -> 681200)
+    suffixes = rng.integers(0, 1000, n).astype(str)
+    comptes = np.char.ljust(np.char.add(racines, suffixes), 6, '0').astype('U6')
+
+    montants = np.round(rng.lognormal(mean=10, sigma=2, size=n), 2)
+    return pd.DataFrame({
+        'Libellé': np.array(LIBELLES)[rng.integers(0, len(LIBELLES), n)],
+        'Compte': comptes,
+        'Montant': montants,
+    })
+
+
+def write_ledger(df, filepath):
+    if filepath.lower().endswith('.csv'):
+        df.to_csv(filepath, index=False)
+    else:
+        if len(df) > LIGNES_MAX_XLSX:
+            raise ValueError(f"Une feuille Excel est limitée à {LIGNES_MAX_XLSX} lignes de données")
+        df.to_excel(filepath, index=False, engine='openpyxl')
+    return filepath
+
+
+def ledger_path(dossier, n, fmt, seed=0, part_caf=0.2):
+    return os.path.join(dossier, f"grand_livre_{n}_s{seed}_caf{int(part_caf * 100)}.{fmt}")
+
+
+def ensure_ledger(dossier, n, fmt, seed=0, part_caf=0.2):
+    # Les fichiers générés sont réutilisés d'une exécution à l'autre
+    filepath = ledger_path(dossier, n, fmt, seed, part_caf)
+    if not os.path.exists(filepath):
+        os.makedirs(dossier, exist_ok=True)
+        write_ledger(generate_ledger(n, seed, part_caf), filepath)
+    return filepath
+
+
+def ensure_workbook(dossier, feuilles, lignes, seed=0, part_caf=0.2):
+    # Classeur d'une feuille par mois: la première porte `lignes` lignes, les autres dix fois
+    # moins; une feuille sur deux a un titre au-dessus de l'en-tête
+    filepath = os.path.join(dossier, f"classeur_{feuilles}x{lignes}_s{seed}_caf{int(part_caf * 100)}.xlsx")
+    if not os.path.exists(filepath):
+        os.makedirs(dossier, exist_ok=True)
+        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+            for i in range(feuilles):
+                df = generate_ledger(lignes if i == 0 else max(1, lignes // 10), seed + i, part_caf)
+                nom = f"Mois {i + 1}"
+                decalage = 2 if i % 2 else 0
+                df.to_excel(writer, sheet_name=nom, index=False, startrow=decalage)
+                if decalage:
+                    writer.sheets[nom].cell(row=1, column=1, value=f"Grand livre - {nom}")
+    return filepath
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des grands livres PCN synthétiques")
+    parser.add_argument('--rows', type=int, nargs='+', default=TAILLES[:3])
+    parser.add_argument('--format', nargs='+', choices=['csv', 'xlsx'], default=['csv', 'xlsx'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--part-caf', type=float, default=0.2)
+    parser.add_argument('--out', default='bench_data')
+    args = parser.parse_args(argv)
+
+    for n in args.rows:
+        for fmt in args.format:
+            if fmt == 'xlsx' and n > LIGNES_MAX_XLSX:
+                print(f"{n} lignes: xlsx ignoré (limite Excel)", file=sys.stderr)
+                continue
+            print(ensure_ledger(args.out, n, fmt, args.seed, args.part_caf))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
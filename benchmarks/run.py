@@ -0,0 +1,338 @@
+"""Mesure de chaque étape (import, calcul, graphique, interprétation, export) par taille de grand livre."""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from generate import LIGNES_MAX_XLSX, ensure_ledger, ensure_workbook  # noqa: E402
+
+# Taille de l'arbre d'entités mesuré (holding, filiales, unités)
+ENTITES_CONSOLIDATION = 2_000
+
+# Dix ans de périodes mensuelles pour les courbes d'évolution
+PERIODES_EVOLUTION = 120
+
+# Classeur multi-feuilles: une grande feuille et des feuilles dix fois plus petites
+FEUILLES_CLASSEUR = 50
+LIGNES_FEUILLE = 20_000
+
+
+def timed(fn, repeat):
+    # Meilleur temps sur `repeat` exécutions, et la valeur renvoyée par la dernière
+    meilleur = None
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        valeur = fn()
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur, valeur
+
+
+def bench_headless(filepath, repeat):
+    from chart import render_chart_png
+    from engine import compute_from_totals
+    from interpretation import get_interpretation
+    from ledger import Ledger
+    from ledger_filter import LedgerIndex
+    from ledger_io import iter_ledger_chunks
+    from report import render_report
+
+    def importer():
+        ledger = Ledger()
+        for chunk in iter_ledger_chunks(filepath):
+            ledger.append_frame(chunk)
+        return ledger
+
+    mesures = {}
+    mesures['import'], ledger = timed(importer, repeat)
+    # Premier filtre (index construits), puis filtre suivant sur les mêmes index
+    mesures['filter_index'], _ = timed(lambda: LedgerIndex(ledger).rows('6', 'cession'), repeat)
+    index = LedgerIndex(ledger)
+    index.rows('6', 'cession')
+    mesures['filter'], _ = timed(lambda: index.rows('68', 'cession', caf=True), repeat)
+    mesures['calculate'], resultats = timed(
+        lambda: compute_from_totals(ledger.recompute_totals()), repeat
+    )
+    mesures['interpretation'], _ = timed(
+        lambda: get_interpretation(resultats['resultat_net'], resultats['caf'], resultats['autofinancement'], 0.0),
+        repeat
+    )
+    mesures['chart'], _ = timed(
+        lambda: render_chart_png(resultats['resultat_net'], resultats['caf'], resultats['autofinancement']),
+        repeat
+    )
+    with tempfile.TemporaryDirectory() as dossier:
+        mesures['export'], _ = timed(
+            lambda: render_report(os.path.join(dossier, 'rapport.pdf'), resultats), repeat
+        )
+    return mesures, len(ledger)
+
+
+def bench_qt(filepath, repeat):
+    # Même chaîne, à travers la fenêtre réelle sur la plateforme Qt hors écran
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QThreadPool
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    from calculator import AutofinancementCalculator, _export_task
+    from ledger_io import iter_ledger_chunks
+    from workers import Worker
+
+    fenetre = AutofinancementCalculator()
+    fenetre.ledger_cache = None
+    fenetre.show()
+
+    def wait_idle():
+        pool = QThreadPool.globalInstance()
+        while pool.activeThreadCount() or fenetre.recalc._courant is not None:
+            app.processEvents()
+            pool.waitForDone(5)
+        app.processEvents()
+
+    def importer():
+        fenetre.ledger_model.clear()
+        for chunk in iter_ledger_chunks(filepath):
+            fenetre.append_import_chunk(chunk)
+            app.processEvents()
+        return len(fenetre.ledger_model.ledger)
+
+    def calculer():
+        fenetre.calculate()
+        wait_idle()
+        return fenetre.last_results
+
+    def graphique():
+        fenetre.update_chart(resultats['resultat_net'], resultats['caf'], resultats['autofinancement'])
+        fenetre.redraw_chart()
+        fenetre.canvas.draw()
+
+    mesures = {}
+    mesures['import'], lignes = timed(importer, repeat)
+    mesures['calculate'], resultats = timed(calculer, repeat)
+    mesures['interpretation'], _ = timed(
+        lambda: fenetre.get_interpretation(resultats['resultat_net'], resultats['caf'], resultats['autofinancement'], 0.0),
+        repeat
+    )
+    mesures['chart'], _ = timed(graphique, repeat)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        textes = fenetre.report_texts(fenetre.current_results())
+        valeurs = [resultats['resultat_net'], resultats['caf'], resultats['autofinancement']]
+        filepath = os.path.join(dossier, 'rapport.pdf')
+        worker = Worker(_export_task)
+        mesures['export'], _ = timed(
+            lambda: _export_task(
+                worker, filepath, valeurs, lambda chart_src: fenetre.generate_report_html(chart_src, textes)
+            ),
+            repeat
+        )
+
+    fenetre.close()
+    return mesures, lignes
+
+
+def bench_consolidation(entites, repeat, seed):
+    # Arbre synthétique: holding, filiales, unités; totaux tirés au hasard (sans fichiers)
+    import numpy as np
+
+    from consolidation import Consolidation
+    from engine import CATEGORIES
+
+    rng = np.random.default_rng(seed)
+    consolidation = Consolidation()
+    consolidation.add_entity('groupe')
+    filiales = max(1, int(entites ** 0.5))
+    for f in range(filiales):
+        consolidation.add_entity(f'filiale-{f}', 'groupe')
+    for u in range(entites - filiales - 1):
+        consolidation.add_entity(f'unite-{u}', f'filiale-{u % filiales}')
+    for entite in consolidation.entites:
+        consolidation.set_totals(entite, rng.integers(0, 10**9, len(CATEGORIES)))
+
+    mesures = {}
+    mesures['consolidate'], _ = timed(consolidation.rollup, repeat)
+    feuille = consolidation.entites[-1]
+    mesures['consolidate_leaf'], _ = timed(
+        lambda: consolidation.set_totals(feuille, rng.integers(0, 10**9, len(CATEGORIES))), repeat
+    )
+    return mesures
+
+
+def bench_trends(periodes, repeat, seed):
+    # Indicateurs de toutes les périodes puis rendu des courbes (totaux tirés au hasard)
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from chart import TrendChart
+    from engine import CATEGORIES
+    from periods import PeriodSeries
+
+    rng = np.random.default_rng(seed)
+    series = PeriodSeries()
+    for i in range(periodes):
+        series.set_period(f"{2000 + i // 12}-{i % 12 + 1:02d}", rng.integers(0, 10**9, len(CATEGORIES)))
+
+    figure = Figure(figsize=(8, 4), dpi=100, tight_layout=True)
+    FigureCanvasAgg(figure)
+    courbes = TrendChart(figure)
+
+    def dessiner():
+        indicateurs = series.indicators()
+        courbes.update(
+            indicateurs['periodes'], indicateurs['resultat_net'], indicateurs['caf'],
+            indicateurs['autofinancement'], indicateurs['taux']
+        )
+        figure.canvas.draw()
+
+    mesures = {}
+    mesures['trend_indicators'], _ = timed(series.indicators, repeat)
+    mesures['trend_chart'], _ = timed(dessiner, repeat)
+    return mesures
+
+
+def bench_workbook(filepath, repeat):
+    # Toutes les feuilles en parallèle, comparé à la lecture de la plus grande seule
+    from ledger_io import read_sheet, read_workbook
+
+    mesures = {}
+    mesures['workbook'], df = timed(lambda: read_workbook(filepath), repeat)
+    mesures['workbook_largest'], _ = timed(lambda: read_sheet(filepath, 'Mois 1'), repeat)
+    return mesures, len(df)
+
+
+def bench_startup(repeat):
+    # Temps jusqu'au premier affichage de la fenêtre, mesuré par main.py dans un processus neuf
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    meilleur = None
+    for _ in range(repeat):
+        sortie = subprocess.check_output(
+            [sys.executable, os.path.join(RACINE, 'main.py'), '--startup-time'],
+            cwd=RACINE, env=env, text=True, stderr=subprocess.DEVNULL
+        )
+        duree = float(sortie.strip().splitlines()[-1])
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RACINE, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'inconnu'
+
+
+def run(tailles, formats, modes, repeat, dossier_donnees, seed, part_caf):
+    if 'qt' in modes:
+        # Une QApplication (et non une simple QGuiApplication) doit exister avant tout rendu PDF
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+        QApplication.instance() or QApplication([])
+
+    resultats = []
+    if 'qt' in modes:
+        secondes = bench_startup(repeat)
+        resultats.append({
+            'mode': 'qt', 'format': '-', 'rows': 0, 'stage': 'startup',
+            'seconds': secondes, 'rows_per_s': None,
+        })
+        print(f"{'qt':8} {'-':4} {0:>9} {'startup':15} {secondes * 1000:10.1f} ms", file=sys.stderr)
+
+    if 'headless' in modes:
+        classeur = ensure_workbook(dossier_donnees, FEUILLES_CLASSEUR, LIGNES_FEUILLE, seed, part_caf)
+        mesures = [
+            (ENTITES_CONSOLIDATION, bench_consolidation(ENTITES_CONSOLIDATION, repeat, seed)),
+            (PERIODES_EVOLUTION, bench_trends(PERIODES_EVOLUTION, repeat, seed)),
+        ]
+        mesures_classeur, lignes_classeur = bench_workbook(classeur, repeat)
+        mesures.append((lignes_classeur, mesures_classeur))
+        for n, etapes in mesures:
+            for etape, secondes in etapes.items():
+                resultats.append({
+                    'mode': 'headless', 'format': '-', 'rows': n, 'stage': etape,
+                    'seconds': secondes, 'rows_per_s': None,
+                })
+                print(f"{'headless':8} {'-':4} {n:>9} {etape:15} {secondes * 1000:10.1f} ms", file=sys.stderr)
+
+    for n in tailles:
+        for fmt in formats:
+            if fmt == 'xlsx' and n > LIGNES_MAX_XLSX:
+                continue
+            filepath = ensure_ledger(dossier_donnees, n, fmt, seed, part_caf)
+            for mode in modes:
+                bench = bench_headless if mode == 'headless' else bench_qt
+                mesures, lignes = bench(filepath, repeat)
+                for etape, secondes in mesures.items():
+                    resultats.append({
+                        'mode': mode, 'format': fmt, 'rows': n, 'stage': etape,
+                        'seconds': secondes, 'rows_per_s': lignes / secondes if secondes else None,
+                    })
+                    print(f"{mode:8} {fmt:4} {n:>9} {etape:15} {secondes * 1000:10.1f} ms", file=sys.stderr)
+    return resultats
+
+
+def compare(ancien, nouveau):
+    # Ratio nouveau/ancien par étape: > 1 signifie une régression
+    def cles(doc):
+        return {(r['mode'], r['format'], r['rows'], r['stage']): r['seconds'] for r in doc['results']}
+
+    avant, apres = cles(ancien), cles(nouveau)
+    print(f"{ancien['commit']} -> {nouveau['commit']}")
+    for cle in sorted(set(avant) & set(apres)):
+        ratio = apres[cle] / avant[cle] if avant[cle] else float('inf')
+        alerte = '  <-- régression' if ratio > 1.10 else ''
+        print(f"{' '.join(map(str, cle)):45} {avant[cle] * 1000:10.1f} -> {apres[cle] * 1000:10.1f} ms  x{ratio:.2f}{alerte}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du calculateur d'autofinancement")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--format', nargs='+', choices=['csv', 'xlsx'], default=['csv', 'xlsx'])
+    parser.add_argument('--mode', nargs='+', choices=['headless', 'qt'], default=['headless', 'qt'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--part-caf', type=float, default=0.2)
+    parser.add_argument('--data', default=os.path.join(RACINE, 'bench_data'))
+    parser.add_argument('--output', default=None, help="Fichier JSON (défaut: bench_results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('ANCIEN', 'NOUVEAU'), help="Compare deux fichiers de résultats")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f1, open(args.compare[1], encoding='utf-8') as f2:
+            compare(json.load(f1), json.load(f2))
+        return 0
+
+    commit = git_commit()
+    document = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'part_caf': args.part_caf,
+        'repeat': args.repeat,
+        'results': run(args.rows, args.format, args.mode, args.repeat, args.data, args.seed, args.part_caf),
+    }
+
+    output = args.output or os.path.join(RACINE, 'bench_results', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"Résultats -> {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,206 @@
+import os
 import sys
-from datetime import datetime
-import traceback
-import pandas as pd
+import time
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QFrame, QTableWidget, QTableWidgetItem,
+    QPushButton, QFrame, QTableView, QProgressBar,
     QFileDialog, QMessageBox, QScrollArea, QHeaderView,
-    QSizePolicy, QLineEdit
+    QSizePolicy, QLineEdit, QGridLayout, QSlider, QSpinBox, QComboBox, QCheckBox
 )
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QTextDocument, QDoubleValidator
-from PySide6.QtPrintSupport import QPrinter
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PySide6.QtCore import Qt, QSize, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QDoubleValidator
+
+# pandas, matplotlib et QtPrintSupport ne sont chargés qu'après le premier affichage
+# (warm_up) ou à la première utilisation
+from engine import CATEGORIES, CENTIMES, compute_from_totals, format_centimes, parse_centime
+from instrumentation import instrumentation
+from interpretation import get_interpretation
+from ledger import Ledger
+from ledger_cache import LedgerCache
+from ledger_filter import LedgerIndex
+from ledger_model import LedgerModel
+from montecarlo import LOIS, simulation_rows
+from periods import PeriodSeries
+from report import CHART_RESOURCE, format_montant, generate_report_html, print_html
+from scenarios import AXE_DIVIDENDES, COMPOSANTES, LIBELLES as LIBELLES_SCENARIOS
+from session import EXTENSION as EXTENSION_SESSION, load_session, save_session
+from workers import LatestOnlyRunner, Worker
+
+# Lignes insérées dans le tableau entre deux rafraîchissements de l'interface
+TAILLE_BLOC_IMPORT = 5_000
+
+# Délai de regroupement des redessins du graphique (ms)
+DELAI_GRAPHIQUE = 50
+
+# Plages par défaut des scénarios: (amplitude en %, nombre de points).
+# Dividendes: de 0 à amplitude × CAF; composantes: ± amplitude autour du total actuel.
+PLAGES_SCENARIOS = {AXE_DIVIDENDES: (100, 41), **{nom: (20, 7) for nom in COMPOSANTES}}
+
+# Lois par défaut de la simulation: (loi, écart relatif en %)
+LOIS_SIMULATION = {
+    'resultat_net': ('normale', 20),
+    'dotations': ('normale', 10),
+    'valeur_cession': ('normale', 20),
+    'reprises': ('fixe', 0),
+    'produits_cession': ('normale', 20),
+    'subventions': ('fixe', 0),
+}
+LIBELLES_SIMULATION = {'resultat_net': "Résultat net", **LIBELLES_SCENARIOS}
+
+# Étapes résumées dans la barre d'état
+ETAPES_RESUME = ['startup', 'import', 'calculate', 'interpretation', 'chart', 'export']
+
+
+# Tâches exécutées dans le QThreadPool: aucun widget n'y est touché
+
+def _warmup_task(worker):
+    with instrumentation.span('warmup'):
+        import pandas  # noqa: F401
+        import matplotlib.backends.backend_qt5agg  # noqa: F401
+        from PySide6 import QtPrintSupport  # noqa: F401
+
+        import chart  # noqa: F401
+        import ledger_io  # noqa: F401
+
+
+def _import_task(worker, filepath, cache):
+    from ledger_io import iter_ledger_chunks
+
+    with instrumentation.span('import', fichier=os.path.basename(filepath)) as span:
+        # Un fichier déjà importé est relu depuis le cache en une seule fois
+        if cache is not None:
+            try:
+                ledger = cache.get(filepath)
+            except OSError:
+                ledger = None
+            span['cache'] = ledger is not None
+            if ledger is not None:
+                span['rows'] = len(ledger)
+                worker.emit_chunk(ledger)
+                return len(ledger)
+
+        # Copie côté thread de travail seulement pour alimenter le cache
+        ledger = Ledger() if cache is not None else None
+        lignes = 0
+        taille = os.path.getsize(filepath)
+        for chunk in iter_ledger_chunks(filepath, TAILLE_BLOC_IMPORT):
+            worker.emit_chunk(chunk)
+            if ledger is not None:
+                ledger.append_frame(chunk)
+            lignes += len(chunk)
+            message = f"Import: {lignes:,} lignes".replace(",", " ")
+            if 'octets' in chunk.attrs and taille:
+                # Progression réelle (CSV): position atteinte dans le fichier, en pour mille
+                worker.report(min(1000, 1000 * chunk.attrs['octets'] // taille), 1000, message)
+            else:
+                worker.report(lignes, 0, message)
+        span['rows'] = lignes
+
+        if ledger is not None:
+            worker.report(lignes, 0, "Import: mise en cache")
+            try:
+                cache.put(filepath, ledger)
+            except OSError as e:
+                print(f"Could not cache ledger: {e}")
+        return lignes
+
+
+def _import_workbook_task(worker, filepath):
+    # Toutes les feuilles d'un classeur, lues en parallèle; pas de cache: il ne garde
+    # qu'un grand livre par fichier, celui de la première feuille
+    from ledger_io import iter_workbook_sheets
+
+    def progress(fait, total):
+        worker.report(fait, total, f"Import: feuille {fait}/{total}")
+
+    with instrumentation.span('import', fichier=os.path.basename(filepath), feuilles=True) as span:
+        lignes, ignorees = 0, {}
+        for nom, df, erreur in iter_workbook_sheets(filepath, progress=progress):
+            if erreur:
+                ignorees[nom] = erreur
+            else:
+                # Un bloc par feuille: le tableau et les totaux suivent feuille après feuille
+                worker.emit_chunk(df)
+                lignes += len(df)
+        span['rows'] = lignes
+        return lignes, ignorees
+
+
+def _scenario_task(worker, totals, dividendes, plages, axe_y):
+    from scenarios import axis_values, dividend_values, grid_summary, scenario_grid, worst_case
+
+    with instrumentation.span('scenarios') as span:
+        amplitude, points = plages[AXE_DIVIDENDES]
+        axes = [(AXE_DIVIDENDES, dividend_values(totals, dividendes, amplitude / 100, points))]
+        for nom in COMPOSANTES:
+            amplitude, points = plages[nom]
+            axes.append((nom, axis_values(totals[CATEGORIES.index(nom)], amplitude / 100, points)))
+
+        grille = scenario_grid(totals, axes, dividendes)
+        span['rows'] = grille.size
+        worker.check_cancelled()
+        axe = 1 + COMPOSANTES.index(axe_y)
+        return {
+            'resume': grid_summary(grille),
+            'carte': worst_case(grille, 0, axe) / CENTIMES,
+            'x': axes[0][1] / CENTIMES,
+            'y': axes[axe][1] / CENTIMES,
+            'axe_y': axe_y,
+        }
+
+
+def _simulation_task(worker, totals, dividendes, lois, tirages, graine):
+    from montecarlo import simulate
+
+    with instrumentation.span('simulation', rows=tirages):
+        return simulate(
+            totals, lois, dividendes, tirages, graine,
+            progress=lambda fait, total: worker.report(fait, total, f"Simulation: bloc {fait}/{total}")
+        )
+
+
+def _periods_task(worker, series, fichiers, dividendes):
+    with instrumentation.span('periods', fichiers=len(fichiers)) as span:
+        span['rows'] = series.load_files(
+            fichiers, dividendes,
+            progress=lambda fait, total: worker.report(fait, total, f"Périodes: {fait}/{total} fichiers")
+        )
+        return series.indicators()
+
+
+def _interpret(resultats):
+    resultats['interpretation'] = get_interpretation(
+        resultats['resultat_net'], resultats['caf'], resultats['autofinancement'], resultats['dividendes']
+    )
+    return resultats
+
+
+def _calculate_task(worker, totals, dividendes):
+    with instrumentation.span('calculate'):
+        resultats = compute_from_totals(totals, dividendes)
+    worker.check_cancelled()
+    with instrumentation.span('interpretation'):
+        return _interpret(resultats)
+
+
+def _export_task(worker, filepath, valeurs, html_for_chart):
+    from chart import render_chart_png
+
+    with instrumentation.span('export', fichier=os.path.basename(filepath)):
+        worker.report(0, 3, "Export: graphique")
+        chart_png = render_chart_png(*valeurs)
+
+        worker.report(1, 3, "Export: mise en page")
+        html = html_for_chart(CHART_RESOURCE)
+
+        worker.report(2, 3, "Export: PDF")
+        return print_html(filepath, html, chart_png)
+
 
 class AutofinancementCalculator(QMainWindow):
+    # Relaie les étapes mesurées (quel que soit leur thread) vers la barre d'état
+    span_recorded = Signal(dict)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Calculateur d'Autofinancement")
@@ -32,8 +218,28 @@ class AutofinancementCalculator(QMainWindow):
         main_layout.setContentsMargins(15, 15, 15, 15)
         main_layout.setSpacing(15)
         
+        # Traitements longs hors du thread de l'interface
+        self.thread_pool = QThreadPool.globalInstance()
+        self.current_task = None
+        self.recalc = LatestOnlyRunner(self.thread_pool, self)
+        self.scenarios_runner = LatestOnlyRunner(self.thread_pool, self)
+        self.last_results = None
+        self.last_simulation = None
+        self.periods = PeriodSeries()
+        
+        # Cache disque des fichiers déjà importés (désactivé si le dossier est inaccessible)
+        try:
+            self.ledger_cache = LedgerCache()
+        except OSError as e:
+            print(f"Ledger cache disabled: {e}")
+            self.ledger_cache = None
+        
         # Setup UI components
         self.setup_ui(main_layout)
+        self.setup_status_bar()
+        
+        self.span_recorded.connect(self.show_timings)
+        instrumentation.listeners.append(self.span_recorded.emit)
     
     def setup_ui(self, main_layout):
         # Title
@@ -77,8 +283,108 @@ class AutofinancementCalculator(QMainWindow):
         results_frame = self.create_results_frame()
         main_layout.addWidget(results_frame)
         
+        # Scénarios « et si », calculés seulement quand le panneau est ouvert
+        self.scenarios_btn = QPushButton("Scénarios")
+        self.scenarios_btn.setObjectName("scenariosButton")
+        self.scenarios_btn.setCheckable(True)
+        self.scenarios_btn.setFixedSize(200, 40)
+        main_layout.addWidget(self.scenarios_btn, alignment=Qt.AlignCenter)
+        self.scenario_frame = self.create_scenario_frame()
+        self.scenario_frame.hide()
+        main_layout.addWidget(self.scenario_frame)
+        
+        # Simulation de Monte-Carlo: tâche longue, lancée à la demande
+        self.simulation_btn = QPushButton("Simulation")
+        self.simulation_btn.setObjectName("simulationButton")
+        self.simulation_btn.setCheckable(True)
+        self.simulation_btn.setFixedSize(200, 40)
+        main_layout.addWidget(self.simulation_btn, alignment=Qt.AlignCenter)
+        self.simulation_frame = self.create_simulation_frame()
+        self.simulation_frame.hide()
+        main_layout.addWidget(self.simulation_frame)
+        
+        # Évolution sur plusieurs périodes: les périodes lues restent en mémoire
+        self.periods_btn = QPushButton("Évolution")
+        self.periods_btn.setObjectName("periodsButton")
+        self.periods_btn.setCheckable(True)
+        self.periods_btn.setFixedSize(200, 40)
+        main_layout.addWidget(self.periods_btn, alignment=Qt.AlignCenter)
+        self.periods_frame = self.create_periods_frame()
+        self.periods_frame.hide()
+        main_layout.addWidget(self.periods_frame)
+        
         # Connect signals
         self.calculate_btn.clicked.connect(self.calculate)
+        self.recalc.finished.connect(self.apply_results)
+        self.recalc.error.connect(self.calculation_failed)
+        self.ledger_model.dataChanged.connect(self.update_key_results)
+        self.dividend_input.textChanged.connect(self.update_key_results)
+        self.scenarios_btn.toggled.connect(self.toggle_scenarios)
+        self.simulation_btn.toggled.connect(self.simulation_frame.setVisible)
+        self.periods_btn.toggled.connect(self.periods_frame.setVisible)
+        self.scenarios_runner.finished.connect(self.apply_scenarios)
+        self.scenarios_runner.error.connect(self.scenarios_failed)
+    
+    def setup_status_bar(self):
+        self.progress_label = QLabel("")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.cancel_btn = QPushButton("Annuler")
+        self.cancel_btn.clicked.connect(self.cancel_task)
+        
+        self.statusBar().addPermanentWidget(self.progress_label)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_btn)
+        self.end_task()
+    
+    def start_task(self, fn, *args):
+        # Une seule tâche longue (import ou export) à la fois
+        worker = Worker(fn, *args)
+        worker.signals.progress.connect(self.show_progress)
+        self.current_task = worker
+        
+        self.import_excel.setEnabled(False)
+        self.export_btn.setEnabled(False)
+        self.open_session_btn.setEnabled(False)
+        self.save_session_btn.setEnabled(False)
+        self.run_simulation_btn.setEnabled(False)
+        self.add_periods_btn.setEnabled(False)
+        self.clear_periods_btn.setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.cancel_btn.show()
+        return worker
+    
+    def show_progress(self, fait, total, message):
+        if total:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(fait)
+        self.progress_label.setText(message)
+    
+    def end_task(self, message=""):
+        self.current_task = None
+        self.import_excel.setEnabled(True)
+        self.export_btn.setEnabled(True)
+        self.open_session_btn.setEnabled(True)
+        self.save_session_btn.setEnabled(True)
+        self.run_simulation_btn.setEnabled(True)
+        self.add_periods_btn.setEnabled(True)
+        self.clear_periods_btn.setEnabled(True)
+        self.progress_bar.hide()
+        self.cancel_btn.hide()
+        self.progress_label.setText(message)
+    
+    def show_timings(self, enregistrement):
+        self.statusBar().showMessage(instrumentation.summary(ETAPES_RESUME))
+    
+    def closeEvent(self, event):
+        if self.span_recorded.emit in instrumentation.listeners:
+            instrumentation.listeners.remove(self.span_recorded.emit)
+        super().closeEvent(event)
+    
+    def cancel_task(self):
+        if self.current_task is not None:
+            self.current_task.cancel()
     
     def create_input_frame(self):
         frame = QFrame()
@@ -93,25 +399,73 @@ class AutofinancementCalculator(QMainWindow):
         button_row = QHBoxLayout()
         button_row.setSpacing(15)
         
-        self.import_excel = QPushButton("Importer Excel")
+        self.import_excel = QPushButton("Importer Excel/CSV")
         self.import_excel.setObjectName("importButton")
         self.import_excel.setFixedHeight(40)
         self.import_excel.clicked.connect(self.import_xlsx_data)
         
+        self.all_sheets_check = QCheckBox("Toutes les feuilles")
+        self.all_sheets_check.setToolTip("Importer toutes les feuilles d'un classeur Excel, marquées par leur nom")
+        
         self.add_row_button = QPushButton("+ Ajouter une ligne")
         self.add_row_button.setObjectName("addRowButton")
         self.add_row_button.setFixedHeight(40)
         self.add_row_button.clicked.connect(self.add_table_row)
         
+        self.open_session_btn = QPushButton("Ouvrir session")
+        self.open_session_btn.setObjectName("openSessionButton")
+        self.open_session_btn.setFixedHeight(40)
+        self.open_session_btn.setShortcut("Ctrl+O")
+        self.open_session_btn.clicked.connect(self.open_session)
+        
+        self.save_session_btn = QPushButton("Enregistrer session")
+        self.save_session_btn.setObjectName("saveSessionButton")
+        self.save_session_btn.setFixedHeight(40)
+        self.save_session_btn.setShortcut("Ctrl+S")
+        self.save_session_btn.clicked.connect(self.save_session)
+        
         button_row.addWidget(self.import_excel)
+        button_row.addWidget(self.all_sheets_check)
         button_row.addWidget(self.add_row_button)
+        button_row.addWidget(self.open_session_btn)
+        button_row.addWidget(self.save_session_btn)
         layout.addLayout(button_row)
 
+        # Filtre du tableau, appliqué à chaque frappe sur des index du grand livre
+        filter_row = QHBoxLayout()
+        filter_row.setSpacing(10)
+        self.filter_compte = QLineEdit()
+        self.filter_compte.setPlaceholderText("Compte (début)")
+        self.filter_libelle = QLineEdit()
+        self.filter_libelle.setPlaceholderText("Libellé (mots)")
+        self.filter_min = QLineEdit()
+        self.filter_min.setPlaceholderText("Montant min")
+        self.filter_min.setValidator(QDoubleValidator())
+        self.filter_max = QLineEdit()
+        self.filter_max.setPlaceholderText("Montant max")
+        self.filter_max.setValidator(QDoubleValidator())
+        self.filter_caf = QCheckBox("Lignes de la CAF")
+        self.filter_caf.setToolTip("N'afficher que les comptes qui alimentent le tableau de CAF")
+        self.filter_count = QLabel("")
+        for champ in (self.filter_compte, self.filter_libelle, self.filter_min, self.filter_max):
+            champ.textChanged.connect(self.apply_filter)
+        self.filter_caf.toggled.connect(self.apply_filter)
+        filter_row.addWidget(self.filter_compte)
+        filter_row.addWidget(self.filter_libelle, stretch=1)
+        filter_row.addWidget(self.filter_min)
+        filter_row.addWidget(self.filter_max)
+        filter_row.addWidget(self.filter_caf)
+        filter_row.addWidget(self.filter_count)
+        layout.addLayout(filter_row)
+
         # Table
         table_scroll = QScrollArea()
         table_scroll.setWidgetResizable(True)
 
-        self.input_table = QTableWidget()
+        self.ledger_model = LedgerModel()
+        self.ledger_index = LedgerIndex(self.ledger_model.ledger)
+        self.input_table = QTableView()
+        self.input_table.setModel(self.ledger_model)
         self.setup_table()
 
         table_scroll.setWidget(self.input_table)
@@ -120,20 +474,41 @@ class AutofinancementCalculator(QMainWindow):
         return frame
     
     def add_table_row(self):
-        row_position = self.input_table.rowCount()
-        self.input_table.insertRow(row_position)
-        self.input_table.setItem(row_position, 0, QTableWidgetItem(""))
-        self.input_table.setItem(row_position, 1, QTableWidgetItem(""))
-        self.input_table.setItem(row_position, 2, QTableWidgetItem("0"))
+        row_position = self.ledger_model.append_row()
+        self.input_table.scrollTo(self.ledger_model.index(row_position, 0))
 
-    def setup_table(self):
-        self.input_table.setColumnCount(3)
-        self.input_table.setHorizontalHeaderLabels(["Libellé", "Compte", "Montant (DZD)"])
-        self.input_table.setRowCount(0)
+    def apply_filter(self, *args):
+        ledger = self.ledger_model.ledger
+        if self.ledger_index.ledger is not ledger:
+            self.ledger_index = LedgerIndex(ledger)
+        bornes = [
+            parse_centime(champ.text()) if champ.text().strip() else None
+            for champ in (self.filter_min, self.filter_max)
+        ]
+        with instrumentation.span('filter', rows=len(ledger)) as span:
+            lignes = self.ledger_index.rows(
+                self.filter_compte.text(), self.filter_libelle.text(), *bornes, self.filter_caf.isChecked()
+            )
+            self.ledger_model.set_filter(lignes)
+            span['matches'] = len(ledger) if lignes is None else len(lignes)
+        if lignes is None:
+            self.filter_count.setText("")
+        else:
+            self.filter_count.setText(f"{len(lignes):,} / {len(ledger):,} lignes".replace(",", " "))
 
+    def setup_table(self):
+        # Pas de ResizeToContents permanent: chaque saisie relirait des centaines de cellules.
+        # Les colonnes sont ajustées une fois après l'import (voir fit_table_columns).
+        self.input_table.horizontalHeader().setResizeContentsPrecision(200)
         self.input_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.input_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.input_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.input_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Interactive)
+        self.input_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Interactive)
+        self.fit_table_columns()
+
+    def fit_table_columns(self):
+        self.input_table.resizeColumnToContents(1)
+        self.input_table.resizeColumnToContents(2)
+        self.input_table.resizeColumnToContents(3)
         self.input_table.verticalHeader().setDefaultSectionSize(40)
         self.input_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
     
@@ -208,10 +583,25 @@ class AutofinancementCalculator(QMainWindow):
         chart_title.setObjectName("chartTitle")
         layout.addWidget(chart_title, alignment=Qt.AlignCenter)
         
-        self.figure = Figure(figsize=(5, 4), dpi=100, tight_layout=True)
-        self.canvas = FigureCanvas(self.figure)
-        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        layout.addWidget(self.canvas)
+        # Emplacement du graphique, remplacé par le canevas matplotlib dans setup_chart()
+        self.chart_layout = layout
+        self.chart_placeholder = QWidget()
+        self.chart_placeholder.setMinimumSize(300, 240)
+        self.chart_placeholder.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.chart_placeholder)
+        self.figure = None
+        self.canvas = None
+        self.chart = None
+        self.warmup_worker = None
+        
+        # Plusieurs recalculs rapprochés ne provoquent qu'un seul redessin
+        self.pending_chart = None
+        # Début de l'étape 'chart', close par le draw_event du dessin différé
+        self.chart_debut = None
+        self.chart_timer = QTimer(self)
+        self.chart_timer.setSingleShot(True)
+        self.chart_timer.setInterval(DELAI_GRAPHIQUE)
+        self.chart_timer.timeout.connect(self.redraw_chart)
         
         self.export_btn = QPushButton("Exporter PDF")
         self.export_btn.setObjectName("exportButton")
@@ -221,340 +611,556 @@ class AutofinancementCalculator(QMainWindow):
         
         return box
     
+    def create_scenario_frame(self):
+        frame = QFrame()
+        frame.setObjectName("scenarioFrame")
+        
+        layout = QHBoxLayout(frame)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(20)
+        
+        controls = QGridLayout()
+        controls.setSpacing(8)
+        self.scenario_controls = {}
+        for ligne, nom in enumerate([AXE_DIVIDENDES] + COMPOSANTES):
+            amplitude, points = PLAGES_SCENARIOS[nom]
+            curseur = QSlider(Qt.Horizontal)
+            curseur.setRange(0, 200 if nom == AXE_DIVIDENDES else 100)
+            curseur.setValue(amplitude)
+            plage = QLabel()
+            nombre = QSpinBox()
+            nombre.setRange(1, 201)
+            nombre.setValue(points)
+            nombre.setSuffix(" pts")
+            
+            controls.addWidget(QLabel(LIBELLES_SCENARIOS[nom]), ligne, 0)
+            controls.addWidget(curseur, ligne, 1)
+            controls.addWidget(plage, ligne, 2)
+            controls.addWidget(nombre, ligne, 3)
+            self.scenario_controls[nom] = (curseur, nombre, plage)
+            curseur.valueChanged.connect(self.update_scenarios)
+            nombre.valueChanged.connect(self.update_scenarios)
+        
+        self.scenario_axis = QComboBox()
+        for nom in COMPOSANTES:
+            self.scenario_axis.addItem(LIBELLES_SCENARIOS[nom], nom)
+        self.scenario_axis.currentIndexChanged.connect(self.update_scenarios)
+        ligne = len(self.scenario_controls)
+        controls.addWidget(QLabel("Axe vertical"), ligne, 0)
+        controls.addWidget(self.scenario_axis, ligne, 1, 1, 3)
+        
+        self.scenario_summary = QLabel("")
+        self.scenario_summary.setWordWrap(True)
+        controls.addWidget(self.scenario_summary, ligne + 1, 0, 1, 4)
+        controls.setRowStretch(ligne + 2, 1)
+        layout.addLayout(controls, stretch=1)
+        
+        # Carte de chaleur créée à la première grille calculée (matplotlib chargé à la demande)
+        self.scenario_layout = layout
+        self.scenario_placeholder = QWidget()
+        self.scenario_placeholder.setMinimumSize(300, 240)
+        self.scenario_placeholder.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.scenario_placeholder, stretch=1)
+        self.scenario_canvas = None
+        self.scenario_chart = None
+        
+        return frame
+    
+    def create_simulation_frame(self):
+        frame = QFrame()
+        frame.setObjectName("simulationFrame")
+        
+        layout = QHBoxLayout(frame)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(20)
+        
+        # Une loi d'incertitude par catégorie, en écart relatif autour de son total
+        controls = QGridLayout()
+        controls.setSpacing(8)
+        self.simulation_controls = {}
+        for ligne, (nom, (loi, ecart)) in enumerate(LOIS_SIMULATION.items()):
+            choix = QComboBox()
+            choix.addItems(LOIS)
+            choix.setCurrentText(loi)
+            pourcentage = QSpinBox()
+            pourcentage.setRange(0, 200)
+            pourcentage.setValue(ecart)
+            pourcentage.setSuffix(" %")
+            controls.addWidget(QLabel(LIBELLES_SIMULATION[nom]), ligne, 0)
+            controls.addWidget(choix, ligne, 1)
+            controls.addWidget(pourcentage, ligne, 2)
+            self.simulation_controls[nom] = (choix, pourcentage)
+        
+        ligne = len(self.simulation_controls)
+        self.simulation_draws = QSpinBox()
+        self.simulation_draws.setRange(10_000, 50_000_000)
+        self.simulation_draws.setSingleStep(1_000_000)
+        self.simulation_draws.setValue(1_000_000)
+        self.simulation_draws.setGroupSeparatorShown(True)
+        self.simulation_seed = QSpinBox()
+        self.simulation_seed.setRange(0, 2**31 - 1)
+        controls.addWidget(QLabel("Tirages"), ligne, 0)
+        controls.addWidget(self.simulation_draws, ligne, 1, 1, 2)
+        controls.addWidget(QLabel("Graine"), ligne + 1, 0)
+        controls.addWidget(self.simulation_seed, ligne + 1, 1, 1, 2)
+        
+        self.run_simulation_btn = QPushButton("Lancer la simulation")
+        self.run_simulation_btn.setObjectName("runSimulationButton")
+        self.run_simulation_btn.setFixedHeight(40)
+        self.run_simulation_btn.clicked.connect(self.run_simulation)
+        controls.addWidget(self.run_simulation_btn, ligne + 2, 0, 1, 3)
+        controls.setRowStretch(ligne + 3, 1)
+        layout.addLayout(controls, stretch=1)
+        
+        self.simulation_value = QLabel("")
+        self.simulation_value.setObjectName("simulationText")
+        self.simulation_value.setWordWrap(True)
+        self.simulation_value.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        layout.addWidget(self.simulation_value, stretch=1)
+        
+        return frame
+    
+    def create_periods_frame(self):
+        frame = QFrame()
+        frame.setObjectName("periodsFrame")
+        
+        layout = QVBoxLayout(frame)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+        
+        button_row = QHBoxLayout()
+        self.add_periods_btn = QPushButton("Ajouter des périodes")
+        self.add_periods_btn.setObjectName("addPeriodsButton")
+        self.add_periods_btn.setFixedHeight(40)
+        self.add_periods_btn.clicked.connect(self.add_periods)
+        self.clear_periods_btn = QPushButton("Vider")
+        self.clear_periods_btn.setObjectName("clearPeriodsButton")
+        self.clear_periods_btn.setFixedHeight(40)
+        self.clear_periods_btn.clicked.connect(self.clear_periods)
+        self.periods_summary = QLabel("Aucune période")
+        self.periods_summary.setWordWrap(True)
+        button_row.addWidget(self.add_periods_btn)
+        button_row.addWidget(self.clear_periods_btn)
+        button_row.addWidget(self.periods_summary, stretch=1)
+        layout.addLayout(button_row)
+        
+        # Courbes créées au premier affichage (matplotlib chargé à la demande)
+        self.periods_layout = layout
+        self.periods_placeholder = QWidget()
+        self.periods_placeholder.setMinimumSize(300, 280)
+        self.periods_placeholder.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.periods_placeholder)
+        self.periods_canvas = None
+        self.periods_chart = None
+        
+        return frame
+    
     def import_xlsx_data(self):
         filepath, _ = QFileDialog.getOpenFileName(
             self,
-            "Importer un fichier Excel",
+            "Importer un grand livre",
             "",
-            "Fichiers Excel (*.xlsx *.xls)"
+            "Grands livres (*.xlsx *.xls *.csv);;Fichiers Excel (*.xlsx *.xls);;Fichiers CSV (*.csv)"
         )
 
         if not filepath:
             return
 
-        try:
-            # Lire le fichier Excel
-            try:
-                df = pd.read_excel(filepath, engine='openpyxl')
-            except:
-                df = pd.read_excel(filepath, engine='xlrd')
+        # Vider le tableau avant l'import
+        self.ledger_model.clear()
 
-            # Normaliser les noms de colonnes
-            df.columns = [str(col).strip().lower() for col in df.columns]
-            
-            # Détection des colonnes
-            compte_col = next((col for col in df.columns if 'compte' in col or 'numéro' in col or 'numero' in col), None)
-            montant_col = next((col for col in df.columns if 'montant' in col or 'valeur' in col), None)
-            libelle_col = next((col for col in df.columns if 'libellé' in col or 'libelle' in col or 'désignation' in col), None)
+        # Lecture en flux dans un thread de travail; les blocs sont ajoutés au modèle ici
+        if self.all_sheets_check.isChecked() and not filepath.lower().endswith('.csv'):
+            worker = self.start_task(_import_workbook_task, filepath)
+            worker.signals.finished.connect(self.workbook_import_finished)
+        else:
+            worker = self.start_task(_import_task, filepath, self.ledger_cache)
+            worker.signals.finished.connect(self.import_finished)
+        worker.signals.chunk.connect(self.append_import_chunk)
+        worker.signals.error.connect(self.import_failed)
+        worker.signals.cancelled.connect(self.import_cancelled)
+        self.thread_pool.start(worker)
+    
+    def append_import_chunk(self, chunk):
+        premier = len(self.ledger_model.ledger) == 0
+        with instrumentation.span('insert', rows=len(chunk)):
+            if isinstance(chunk, Ledger):
+                # Grand livre complet relu depuis le cache
+                self.ledger_model.set_ledger(chunk)
+            else:
+                self.ledger_model.append_frame(chunk)
+        # Les totaux sont cumulés bloc par bloc: les résultats clés suivent l'import
+        self.update_key_results()
+        if premier:
+            self.fit_table_columns()
+    
+    def import_finished(self, valid_rows):
+        self.end_task()
+        self.apply_filter()
+        QMessageBox.information(
+            self, 
+            "Succès", 
+            f"Import terminé.\n"
+            f"- Lignes valides importées: {valid_rows}"
+        )
+        
+        if valid_rows > 0:
+            self.calculate()
+    
+    def workbook_import_finished(self, resultat):
+        valid_rows, ignorees = resultat
+        self.end_task()
+        self.apply_filter()
+        feuilles = len(self.ledger_model.ledger.feuilles)
+        message = f"Import terminé.\n- Feuilles importées: {feuilles}\n- Lignes valides importées: {valid_rows}"
+        if ignorees:
+            message += "\n- Feuilles ignorées:\n" + "\n".join(f"  {nom}: {erreur}" for nom, erreur in ignorees.items())
+        QMessageBox.information(self, "Succès", message)
+        
+        if valid_rows > 0:
+            self.calculate()
+    
+    def import_failed(self, message, details):
+        self.end_task()
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'importation :\n{message}")
+    
+    def import_cancelled(self):
+        # Un import partiel serait trompeur: on repart d'un tableau vide
+        self.ledger_model.clear()
+        self.update_key_results()
+        self.end_task("Import annulé")
+    
+    def open_session(self):
+        filepath, _ = QFileDialog.getOpenFileName(
+            self,
+            "Ouvrir une session",
+            "",
+            f"Sessions (*{EXTENSION_SESSION})"
+        )
+        if not filepath:
+            return
+
+        try:
+            with instrumentation.span('session', action='ouverture') as span:
+                ledger, dividendes = load_session(filepath)
+                span['rows'] = len(ledger)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Erreur", f"Impossible d'ouvrir la session :\n{e}")
+            return
 
-            if not compte_col or not montant_col:
-                raise ValueError("Colonnes requises non trouvées: besoin d'une colonne 'compte' et 'montant'")
+        self.ledger_model.set_ledger(ledger)
+        self.apply_filter()
+        self.dividend_input.setText(format_centimes(dividendes, '') if dividendes else "")
+        self.fit_table_columns()
+        self.update_key_results()
+        self.progress_label.setText(f"Session ouverte: {os.path.basename(filepath)}")
 
-            # Filtrer les lignes valides (où le compte n'est pas NaN et est un string non vide)
-            df = df[pd.notna(df[compte_col]) & (df[compte_col].astype(str).str.strip() != '')].copy()
-            
-            # Vider le tableau avant l'import
-            self.input_table.setRowCount(0)
-
-            # Traitement des lignes valides
-            valid_rows = 0
-            for _, row in df.iterrows():
-                try:
-                    compte = str(row[compte_col]).strip()
-                    if not compte:  # Si le compte est une string vide
-                        continue
-                        
-                    libelle = str(row[libelle_col]).strip() if libelle_col and pd.notna(row.get(libelle_col)) else ""
-                    
-                    try:
-                        montant = float(str(row[montant_col]).replace(',', '')) if pd.notna(row[montant_col]) else 0.0
-                    except ValueError:
-                        montant = 0.0
-
-                    current_row = self.input_table.rowCount()
-                    self.input_table.insertRow(current_row)
-                    self.input_table.setItem(current_row, 0, QTableWidgetItem(libelle))
-                    self.input_table.setItem(current_row, 1, QTableWidgetItem(compte))
-                    self.input_table.setItem(current_row, 2, QTableWidgetItem(f"{montant:,.2f}"))
-                    valid_rows += 1
-
-                except Exception as e:
-                    print(f"Ignoring row due to error: {e}")
-                    continue
-
-            QMessageBox.information(
-                self, 
-                "Succès", 
-                f"Import terminé.\n"
-                f"- Lignes valides importées: {valid_rows}"
+    def save_session(self):
+        ledger = self.ledger_model.ledger
+        filepath = ledger.enregistrement['chemin'] if ledger.enregistrement else None
+        if filepath is None:
+            filepath, _ = QFileDialog.getSaveFileName(
+                self,
+                "Enregistrer la session",
+                "",
+                f"Sessions (*{EXTENSION_SESSION})"
             )
-            
-            if valid_rows > 0:
-                self.calculate()
+            if not filepath:
+                return
+            if not filepath.lower().endswith(EXTENSION_SESSION):
+                filepath += EXTENSION_SESSION
 
-        except Exception as e:
-            QMessageBox.critical(self, "Erreur", f"Erreur lors de l'importation :\n{str(e)}")
-    
-    def calculate(self):
         try:
-            # Initialisation des variables
-            resultat_net = 0.0
-            dotations = 0.0
-            valeur_cession = 0.0
-            reprises = 0.0
-            produits_cession = 0.0
-            subventions = 0.0
-
-            # Fonction de conversion
-            def convert_montant(text):
-                try:
-                    text = str(text).strip().replace(' ', '').replace(',', '')
-                    return float(text) if text else 0.0
-                except:
-                    return 0.0
-
-            # Parcours du tableau
-            for row in range(self.input_table.rowCount()):
-                compte_item = self.input_table.item(row, 1)
-                montant_item = self.input_table.item(row, 2)
-
-                if not compte_item or not montant_item:
-                    continue
-
-                compte = compte_item.text().strip()
-                montant = convert_montant(montant_item.text())
-
-                # Logique de calcul
-                if compte.startswith('12'):
-                    resultat_net += montant
-                elif any(compte.startswith(c) for c in ['681', '686', '687']):
-                    dotations += montant
-                elif compte.startswith('675'):
-                    valeur_cession += montant
-                elif any(compte.startswith(c) for c in ['781', '786', '787']):
-                    reprises += montant
-                elif compte.startswith('775'):
-                    produits_cession += montant
-                elif compte.startswith('777'):
-                    subventions += montant
-
-            # Récupération des dividendes depuis le champ input
-            try:
-                dividendes = convert_montant(self.dividend_input.text())
-            except:
-                dividendes = 0.0
-
-            # Calculs finaux
-            caf = (resultat_net + dotations + valeur_cession - reprises - produits_cession - subventions)
-            autofinancement = caf - dividendes
-
-            # Formatage de l'affichage
-            def format_montant(value):
-                return f"{value:,.0f} DZD".replace(",", " ") if value == int(value) else f"{value:,.2f} DZD".replace(",", " ")
-
-            # Mise à jour de l'interface
-            self.resultat_net_value.setText(format_montant(resultat_net))
-            self.caf_value.setText(format_montant(caf))
-            self.autofinancement_value.setText(format_montant(autofinancement))
-            self.interpretation_value.setText(self.get_interpretation(resultat_net, caf, autofinancement, dividendes))
-            
-            self.update_chart(resultat_net, caf, autofinancement)
+            with instrumentation.span('session', action='enregistrement', rows=len(ledger)) as span:
+                span['mode'] = save_session(filepath, ledger, parse_centime(self.dividend_input.text()))
+        except OSError as e:
+            QMessageBox.critical(self, "Erreur", f"Impossible d'enregistrer la session :\n{e}")
+            return
+        self.progress_label.setText(f"Session enregistrée ({span['mode']}): {os.path.basename(filepath)}")
+
+    def update_key_results(self, *args):
+        # O(1): les totaux par catégorie sont tenus à jour par le modèle à chaque saisie
+        dividendes = parse_centime(self.dividend_input.text())
+        resultats = compute_from_totals(self.ledger_model.ledger.category_totals(), dividendes)
+
+        self.resultat_net_value.setText(format_montant(resultats['resultat_net']))
+        self.caf_value.setText(format_montant(resultats['caf']))
+        self.autofinancement_value.setText(format_montant(resultats['autofinancement']))
+        self.update_scenarios()
+        # Interprétation et graphique suivent hors du thread de l'interface (calculs regroupés)
+        self.calculate()
+        return resultats
 
-        except Exception as e:
-            QMessageBox.critical(self, "Erreur", f"Erreur de calcul:\n{str(e)}")
-            print(f"Erreur complète:\n{traceback.format_exc()}")
+    def calculate(self):
+        # Les totaux sont copiés ici; un calcul déjà en attente est remplacé par celui-ci
+        dividendes = parse_centime(self.dividend_input.text())
+        totals = self.ledger_model.ledger.category_totals()
+        self.recalc.submit(_calculate_task, totals, dividendes)
+    
+    def apply_results(self, resultats):
+        # Toujours exécuté sur le thread de l'interface
+        self.last_results = resultats
+        self.resultat_net_value.setText(format_montant(resultats['resultat_net']))
+        self.caf_value.setText(format_montant(resultats['caf']))
+        self.autofinancement_value.setText(format_montant(resultats['autofinancement']))
+        self.interpretation_value.setText(resultats['interpretation'])
+        
+        self.update_chart(resultats['resultat_net'], resultats['caf'], resultats['autofinancement'])
+    
+    def calculation_failed(self, message, details):
+        QMessageBox.critical(self, "Erreur", f"Erreur de calcul:\n{message}")
+        print(f"Erreur complète:\n{details}")
     
 
     def get_interpretation(self, resultat_net, caf, autofinancement, dividendes):
-        interpretations = []
-        
-        # Analyse du résultat net
-        if resultat_net > 0:
-            interpretations.append(
-                "🔹 <b>Résultat Net Positif</b> ({} DZD):\n"
-                "L'entreprise dégage un bénéfice. Cela indique que les produits dépassent les charges, "
-                "ce qui est un signe de bonne santé financière à court terme.".format(f"{resultat_net:,.2f}")
-            )
-        else:
-            interpretations.append(
-                "🔹 <b>Résultat Net Négatif</b> ({} DZD):\n"
-                "L'entreprise est en situation de perte. Cela peut être préoccupant si la tendance persiste, "
-                "mais peut être normal pour une entreprise en phase d'investissement ou de démarrage.".format(f"{resultat_net:,.2f}")
-            )
-        
-        # Analyse de la CAF
-        if caf > resultat_net:
-            cash_info = "La CAF est supérieure au résultat net, ce qui est normal car elle inclut les dotations non décaissables."
-        elif caf == resultat_net:
-            cash_info = "La CAF est égale au résultat net, ce qui est rare et peut indiquer l'absence de dotations."
-        else:
-            cash_info = "La CAF est inférieure au résultat net, situation atypique qui mérite investigation."
-        
-        if caf > 0:
-            interpretations.append(
-                "🔹 <b>CAF Positive</b> ({} DZD):\n"
-                "L'entreprise génère des liquidités internes suffisantes pour:\n"
-                "- Financer ses investissements\n"
-                "- Rembourser ses dettes\n"
-                "- Payer des dividendes\n{}".format(f"{caf:,.2f}", cash_info)
-            )
-        else:
-            interpretations.append(
-                "🔹 <b>CAF Négative</b> ({} DZD):\n"
-                "Attention! L'entreprise ne génère pas assez de cash flow interne.\n"
-                "Cela peut entraîner:\n"
-                "- Des difficultés de trésorerie\n"
-                "- Une dépendance accrue au financement externe\n"
-                "- Des risques de cessation de paiement".format(f"{caf:,.2f}")
-            )
-        
-        # Analyse de l'autofinancement
-        if autofinancement > 0:
-            if dividendes > 0:
-                dividend_info = (
-                    "L'entreprise peut à la fois:\n"
-                    "- Financer sa croissance ({:,.2f} DZD disponibles)\n"
-                    "- Récompenser ses actionnaires ({:,.2f} DZD de dividendes)".format(autofinancement, dividendes)
-                )
+        return get_interpretation(resultat_net, caf, autofinancement, dividendes)
+    
+    
+    def toggle_scenarios(self, visible):
+        self.scenario_frame.setVisible(visible)
+        self.update_scenarios()
+    
+    def scenario_ranges(self):
+        plages = {}
+        for nom, (curseur, nombre, plage) in self.scenario_controls.items():
+            plages[nom] = (curseur.value(), nombre.value())
+            if nom == AXE_DIVIDENDES:
+                plage.setText(f"0 à {curseur.value()} % de la CAF")
             else:
-                dividend_info = "L'entreprise conserve toutes ses ressources pour financer son développement."
+                plage.setText(f"± {curseur.value()} %")
+        return plages
+    
+    def update_scenarios(self, *args):
+        # Chaque mouvement de curseur remplace la grille en attente: seule la dernière est tracée
+        if not self.scenarios_btn.isChecked():
+            return
+        dividendes = parse_centime(self.dividend_input.text())
+        totals = self.ledger_model.ledger.category_totals()
+        self.scenarios_runner.submit(
+            _scenario_task, totals, dividendes, self.scenario_ranges(), self.scenario_axis.currentData()
+        )
+    
+    def apply_scenarios(self, grille):
+        resume = grille['resume']
+        self.scenario_summary.setText(
+            f"{resume['scenarios']:,} scénarios · autofinancement négatif dans "
+            f"{resume['negatifs']:.1%} des cas · de {format_montant(resume['min'] / CENTIMES)} "
+            f"à {format_montant(resume['max'] / CENTIMES)}".replace(",", " ")
+        )
+        
+        if self.scenario_chart is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+            from chart import ScenarioHeatmap
             
-            interpretations.append(
-                "🔹 <b>Autofinancement Positif</b> ({} DZD):\n"
-                "Situation très favorable. {}\n"
-                "La politique de dividendes semble soutenable.".format(f"{autofinancement:,.2f}", dividend_info)
-            )
-        else:
-            interpretations.append(
-                "🔹 <b>Autofinancement Négatif</b> ({} DZD):\n"
-                "Situation risquée! L'entreprise distribue plus de dividendes ({:,.2f} DZD) "
-                "qu'elle ne génère de CAF.\n"
-                "Cela peut conduire à:\n"
-                "- Un endettement excessif\n"
-                "- Une réduction des investissements\n"
-                "- A terme, une baisse de compétitivité".format(f"{autofinancement:,.2f}", dividendes)
-            )
+            figure = Figure(figsize=(5, 4), dpi=100, tight_layout=True)
+            self.scenario_canvas = FigureCanvas(figure)
+            self.scenario_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            self.scenario_layout.replaceWidget(self.scenario_placeholder, self.scenario_canvas)
+            self.scenario_placeholder.deleteLater()
+            self.scenario_placeholder = None
+            self.scenario_chart = ScenarioHeatmap(figure)
         
-        # Recommandations globales
-        recommendations = []
-        if autofinancement < 0:
-            recommendations.append(
-                "🚩 <b>Recommandation urgente</b>: Réviser la politique de dividendes à la baisse "
-                "ou trouver des sources de financement externes."
-            )
-        elif caf < resultat_net:
-            recommendations.append(
-                "🔍 <b>Vérifier</b>: La composition de la CAF pour comprendre pourquoi elle est inférieure au résultat net."
+        # Pire cas sur les composantes qui ne sont pas en ordonnée
+        self.scenario_chart.update(
+            grille['carte'], grille['x'], grille['y'],
+            f"{LIBELLES_SCENARIOS[grille['axe_y']]} (pire cas)"
+        )
+        self.scenario_canvas.draw_idle()
+    
+    def scenarios_failed(self, message, details):
+        self.scenario_summary.setText(message)
+    
+    def run_simulation(self):
+        # Les totaux par catégorie du tableau servent de valeurs centrales
+        lois = {
+            nom: (choix.currentText(), pourcentage.value() / 100)
+            for nom, (choix, pourcentage) in self.simulation_controls.items()
+        }
+        worker = self.start_task(
+            _simulation_task, self.ledger_model.ledger.category_totals(),
+            parse_centime(self.dividend_input.text()), lois,
+            self.simulation_draws.value(), self.simulation_seed.value()
+        )
+        worker.signals.finished.connect(self.simulation_finished)
+        worker.signals.error.connect(self.simulation_failed)
+        worker.signals.cancelled.connect(lambda: self.end_task("Simulation annulée"))
+        self.thread_pool.start(worker)
+    
+    def simulation_finished(self, resultats):
+        self.end_task()
+        self.last_simulation = resultats
+        self.simulation_value.setText(
+            "\n".join(f"{libelle}: {valeur}" for libelle, valeur in simulation_rows(resultats))
+        )
+    
+    def simulation_failed(self, message, details):
+        self.end_task()
+        QMessageBox.critical(self, "Erreur", f"Erreur de simulation:\n{message}")
+    
+    def add_periods(self):
+        fichiers, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Ajouter des périodes",
+            "",
+            "Grands livres (*.xlsx *.xls *.csv);;Fichiers Excel (*.xlsx *.xls);;Fichiers CSV (*.csv)"
+        )
+        if not fichiers:
+            return
+        
+        # La période est lue dans le nom du fichier (2024-03, 202403, 2024...); les dividendes
+        # saisis s'appliquent aux périodes ajoutées
+        worker = self.start_task(
+            _periods_task, self.periods, fichiers, parse_centime(self.dividend_input.text())
+        )
+        worker.signals.finished.connect(self.periods_finished)
+        worker.signals.error.connect(self.periods_failed)
+        worker.signals.cancelled.connect(self.periods_cancelled)
+        self.thread_pool.start(worker)
+    
+    def periods_finished(self, indicateurs):
+        self.end_task()
+        self.show_periods(indicateurs)
+    
+    def periods_failed(self, message, details):
+        self.end_task()
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'import des périodes :\n{message}")
+    
+    def periods_cancelled(self):
+        # Les périodes déjà lues sont conservées
+        self.end_task("Import des périodes annulé")
+        self.show_periods(self.periods.indicators())
+    
+    def clear_periods(self):
+        self.periods.clear()
+        self.show_periods(self.periods.indicators())
+    
+    def show_periods(self, indicateurs):
+        periodes = indicateurs['periodes']
+        texte = f"{len(periodes)} période(s)" if periodes else "Aucune période"
+        if periodes:
+            texte += f", de {periodes[0]} à {periodes[-1]}"
+        if self.periods.erreurs:
+            texte += " · illisibles: " + ", ".join(
+                f"{periode} ({erreur})" for periode, erreur in sorted(self.periods.erreurs.items())
             )
+        if self.periods.doublons:
+            texte += " · écartés: " + ", ".join(sorted(self.periods.doublons.values()))
+        self.periods_summary.setText(texte)
         
-        if recommendations:
-            interpretations.append("\n<b>RECOMMANDATIONS:</b>\n" + "\n".join(recommendations))
+        if self.periods_chart is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+            from chart import TrendChart
+            
+            figure = Figure(figsize=(8, 4), dpi=100, tight_layout=True)
+            self.periods_canvas = FigureCanvas(figure)
+            self.periods_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            self.periods_layout.replaceWidget(self.periods_placeholder, self.periods_canvas)
+            self.periods_placeholder.deleteLater()
+            self.periods_placeholder = None
+            self.periods_chart = TrendChart(figure)
         
-        return "<br>".join(interpretations).replace("\n", "<br>")
-
+        with instrumentation.span('trend_chart', rows=len(periodes)):
+            self.periods_chart.update(
+                periodes, indicateurs['resultat_net'], indicateurs['caf'],
+                indicateurs['autofinancement'], indicateurs['taux']
+            )
+            self.periods_canvas.draw()
     
     def update_chart(self, resultat_net, caf, autofinancement):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        
-        labels = ['Résultat Net', 'CAF', 'Autofinancement']
-        values = [resultat_net, caf, autofinancement]
-        colors = ['#FF5722', '#2196F3', '#4CAF50']
-        
-        width = 0.6
-        x_pos = range(len(values))
-        bars = ax.bar(x_pos, values, width, color=colors)
-        
-        ax.set_xticks(x_pos)
-        ax.set_xticklabels(labels, rotation=15, ha='right')
-        ax.yaxis.set_major_formatter('DZD{x:,.0f}')
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'DZD{height:,.0f}',
-                    ha='center', va='bottom', fontsize=10)
-        
-        y_min = min(0, min(values)*1.1)
-        y_max = max(values)*1.2
-        ax.set_ylim(y_min, y_max)
-        
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(axis='y', alpha=0.3)
+        self.pending_chart = (resultat_net, caf, autofinancement)
+        self.chart_timer.start()
+    
+    def warm_up(self):
+        # Appelé après le premier affichage: les bibliothèques lourdes sont chargées en
+        # arrière-plan, puis le canevas est créé sur le thread de l'interface
+        if self.chart is not None or self.warmup_worker is not None:
+            return
+        self.warmup_worker = Worker(_warmup_task)
+        self.warmup_worker.signals.finished.connect(lambda _: self.setup_chart())
+        self.warmup_worker.signals.error.connect(lambda message, details: self.setup_chart())
+        self.thread_pool.start(self.warmup_worker)
+    
+    def setup_chart(self):
+        if self.chart is not None:
+            return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from chart import CafChart
         
-        self.figure.tight_layout()
-        self.canvas.draw()
+        self.figure = Figure(figsize=(5, 4), dpi=100, tight_layout=True)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.chart_layout.replaceWidget(self.chart_placeholder, self.canvas)
+        self.chart_placeholder.deleteLater()
+        self.chart_placeholder = None
+        self.chart = CafChart(self.figure)
+        self.canvas.mpl_connect('draw_event', self.chart_drawn)
+        if self.pending_chart is not None:
+            self.chart_timer.start()
+    
+    def redraw_chart(self):
+        if self.pending_chart is None:
+            return
+        self.setup_chart()
+        if self.chart_debut is None:
+            self.chart_debut = time.perf_counter()
+        self.chart.update(*self.pending_chart)
+        self.pending_chart = None
+        # draw_idle: le dessin se fait au prochain tour de boucle, fusionné avec les autres demandes
+        self.canvas.draw_idle()
+    
+    def chart_drawn(self, event):
+        # Mise à jour puis dessin effectif, mesurés ensemble
+        if self.chart_debut is not None:
+            instrumentation.mark('chart', self.chart_debut)
+            self.chart_debut = None
     
     def export_to_pdf(self):
         filepath, _ = QFileDialog.getSaveFileName(
             self, "Exporter en PDF", "", "PDF Files (*.pdf)"
         )
         if filepath:
-            try:
-                chart_path = "temp_chart.png"
-                self.figure.savefig(chart_path, bbox_inches='tight', dpi=150)
-                
-                printer = QPrinter(QPrinter.HighResolution)
-                printer.setOutputFormat(QPrinter.PdfFormat)
-                printer.setOutputFileName(filepath)
-                
-                doc = QTextDocument()
-                html = self.generate_report_html(chart_path)
-                doc.setHtml(html)
-                
-                doc.print_(printer)
-                
-                QMessageBox.information(self, "Succès", "Rapport exporté avec succès!")
-                
-            except Exception as e:
-                QMessageBox.warning(self, "Erreur", f"Échec de l'export:\n{str(e)}")
-    
-    def generate_report_html(self, chart_path):
-        return f"""
-        <html>
-        <head>
-        <style>
-        body {{ font-family: Arial; margin: 20px; }}
-        h1 {{ color: #333; border-bottom: 1px solid #eee; padding-bottom: 10px; }}
-        .header {{ background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
-        .result {{ margin: 15px 0; }}
-        .value {{ font-weight: bold; color: #2196F3; }}
-        .interpretation {{ background-color: #f9f9f9; padding: 15px; border-left: 4px solid #2196F3; border-radius: 4px; }}
-        .chart-container {{ text-align: center; margin: 20px 0; }}
-        </style>
-        </head>
-        <body>
-        <div class="header">
-            <h1>Rapport d'Autofinancement</h1>
-            <p>Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}</p>
-        </div>
-        
-        <div class="results">
-            <h2>Résultats Clés</h2>
-            <div class="result">
-                <span>Résultat net de l'exercice: </span>
-                <span class="value">{self.resultat_net_value.text()}</span>
-            </div>
-            <div class="result">
-                <span>Capacité d'Autofinancement (CAF): </span>
-                <span class="value">{self.caf_value.text()}</span>
-            </div>
-            <div class="result">
-                <span>Autofinancement: </span>
-                <span class="value">{self.autofinancement_value.text()}</span>
-            </div>
-        </div>
-        
-        <div class="chart-container">
-            <h2>Visualisation</h2>
-            <img src="{chart_path}" width="500" />
-        </div>
-        
-        <div class="interpretation">
-            <h2>Interprétation</h2>
-            <p>{self.interpretation_value.text().replace('\n\n', '<br><br>')}</p>
-        </div>
-        </body>
-        </html>
-        """
\ No newline at end of file
+            # Chiffres, interprétation et graphique viennent d'un même instantané des totaux;
+            # le rendu se fait dans le thread de travail
+            resultats = self.current_results()
+            textes = self.report_texts(resultats)
+            valeurs = [resultats[cle] for cle in ('resultat_net', 'caf', 'autofinancement')]
+            
+            worker = self.start_task(
+                _export_task, filepath, valeurs,
+                lambda chart_src: self.generate_report_html(chart_src, textes)
+            )
+            worker.signals.finished.connect(self.export_finished)
+            worker.signals.error.connect(self.export_failed)
+            worker.signals.cancelled.connect(self.export_cancelled)
+            self.thread_pool.start(worker)
+    
+    def export_finished(self, filepath):
+        self.end_task()
+        QMessageBox.information(self, "Succès", "Rapport exporté avec succès!")
+    
+    def export_failed(self, message, details):
+        self.end_task()
+        QMessageBox.warning(self, "Erreur", f"Échec de l'export:\n{message}")
+    
+    def export_cancelled(self):
+        self.end_task("Export annulé")
+    
+    def current_results(self):
+        # Résultats des totaux actuels, sans attendre le calcul en cours
+        dividendes = parse_centime(self.dividend_input.text())
+        return _interpret(compute_from_totals(self.ledger_model.ledger.category_totals(), dividendes))
+    
+    def report_texts(self, resultats):
+        return {
+            'resultat_net': format_montant(resultats['resultat_net']),
+            'caf': format_montant(resultats['caf']),
+            'autofinancement': format_montant(resultats['autofinancement']),
+            'interpretation': resultats['interpretation'],
+            'simulation': simulation_rows(self.last_simulation) if self.last_simulation else None,
+        }
+    
+    def generate_report_html(self, chart_path, textes=None):
+        return generate_report_html(textes or self.report_texts(self.current_results()), chart_path)
@@ -0,0 +1,150 @@
+"""Diagrammes (CAF, scénarios, évolution), construits une fois puis mis à jour."""
+from io import BytesIO
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import PercentFormatter
+
+LABELS = ['Résultat Net', 'CAF', 'Autofinancement']
+COLORS = ['#FF5722', '#2196F3', '#4CAF50']
+
+
+class CafChart:
+    # Les barres et les annotations sont créées une seule fois; update() ne fait que
+    # changer leurs hauteurs, textes et les limites de l'axe (pas de figure.clear()).
+
+    def __init__(self, figure):
+        self.figure = figure
+        ax = figure.add_subplot(111)
+        self.ax = ax
+
+        width = 0.6
+        x_pos = range(len(LABELS))
+        self.bars = ax.bar(x_pos, [0.0] * len(LABELS), width, color=COLORS)
+
+        ax.set_xticks(x_pos)
+        ax.set_xticklabels(LABELS, rotation=15, ha='right')
+        ax.yaxis.set_major_formatter('DZD{x:,.0f}')
+
+        self.texts = [
+            ax.text(bar.get_x() + bar.get_width()/2., 0.0, '', ha='center', va='bottom', fontsize=10)
+            for bar in self.bars
+        ]
+
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.grid(axis='y', alpha=0.3)
+        self.update(0.0, 0.0, 0.0)
+
+    def update(self, resultat_net, caf, autofinancement):
+        values = [resultat_net, caf, autofinancement]
+        for bar, text, height in zip(self.bars, self.texts, values):
+            bar.set_height(height)
+            text.set_y(height)
+            text.set_text(f'DZD{height:,.0f}')
+
+        y_min = min(0, min(values)*1.1)
+        y_max = max(0, max(values)*1.2)
+        if y_min == y_max:
+            y_max = 1.0
+        self.ax.set_ylim(y_min, y_max)
+
+
+class ScenarioHeatmap:
+    # Carte de chaleur de l'autofinancement (dividendes en abscisse), avec la frontière
+    # autofinancement = 0; l'image est créée une fois, update() remplace ses données.
+
+    def __init__(self, figure):
+        self.figure = figure
+        ax = figure.add_subplot(111)
+        self.ax = ax
+        self.image = ax.imshow(
+            [[0.0]], origin='lower', aspect='auto', cmap='RdYlGn', interpolation='nearest'
+        )
+        figure.colorbar(self.image, ax=ax, format='DZD{x:,.0f}')
+        self.contour = None
+        ax.set_xlabel('Dividendes')
+        ax.xaxis.set_major_formatter('{x:,.0f}')
+        ax.locator_params(axis='x', nbins=5)
+        ax.tick_params(axis='x', labelrotation=15)
+        ax.yaxis.set_major_formatter('{x:,.0f}')
+
+    def update(self, valeurs, x, y, y_label):
+        # valeurs[y, x] en DZD; x et y: valeurs des axes en DZD
+        self.image.set_data(valeurs)
+        self.image.set_extent(_extent(x) + _extent(y))
+        # Échelle symétrique: le rouge désigne toujours un autofinancement négatif
+        limite = max(abs(float(valeurs.min())), abs(float(valeurs.max()))) or 1.0
+        self.image.set_clim(-limite, limite)
+        self.ax.set_ylabel(y_label)
+
+        if self.contour is not None:
+            if hasattr(self.contour, 'remove'):
+                self.contour.remove()
+            else:  # matplotlib < 3.8
+                for collection in self.contour.collections:
+                    collection.remove()
+            self.contour = None
+        if len(x) > 1 and len(y) > 1 and valeurs.min() < 0 < valeurs.max():
+            self.contour = self.ax.contour(x, y, valeurs, levels=[0], colors='black', linewidths=1)
+
+
+class TrendChart:
+    # Courbes Résultat net / CAF / Autofinancement par période et taux d'autofinancement
+    # (axe de droite); les lignes sont créées une fois, update() remplace leurs données.
+
+    def __init__(self, figure):
+        self.figure = figure
+        ax = figure.add_subplot(111)
+        self.ax = ax
+        self.lines = [ax.plot([], [], color=color, marker='o', markersize=3, label=label)[0]
+                      for label, color in zip(LABELS, COLORS)]
+        ax.yaxis.set_major_formatter('DZD{x:,.0f}')
+        ax.axhline(0, color='grey', linewidth=0.8)
+        ax.spines['top'].set_visible(False)
+        ax.grid(axis='y', alpha=0.3)
+
+        self.ax_taux = ax.twinx()
+        self.line_taux = self.ax_taux.plot([], [], color='#9C27B0', linestyle='--', label="Taux d'autofinancement")[0]
+        self.ax_taux.yaxis.set_major_formatter(PercentFormatter(1.0))
+        self.ax_taux.spines['top'].set_visible(False)
+        ax.legend(handles=self.lines + [self.line_taux], loc='upper left', fontsize=8)
+
+    def update(self, periodes, resultat_net, caf, autofinancement, taux):
+        x = np.arange(len(periodes))
+        for line, valeurs in zip(self.lines, (resultat_net, caf, autofinancement)):
+            line.set_data(x, valeurs)
+        self.line_taux.set_data(x, taux)
+
+        # Au plus une douzaine d'étiquettes, quelle que soit la longueur de la série
+        pas = max(1, -(-len(periodes) // 12))
+        self.ax.set_xticks(x[::pas])
+        self.ax.set_xticklabels(periodes[::pas], rotation=30, ha='right')
+        self.ax.set_xlim(-0.5, max(len(periodes), 1) - 0.5)
+
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        valides = np.asarray(taux, dtype=float)
+        valides = valides[np.isfinite(valides)]
+        if len(valides):
+            marge = max(0.05, 0.1 * (valides.max() - valides.min()))
+            self.ax_taux.set_ylim(valides.min() - marge, valides.max() + marge)
+
+
+def _extent(valeurs):
+    # Bords des cellules de imshow, centrées sur les valeurs de l'axe
+    debut, fin = float(valeurs[0]), float(valeurs[-1])
+    demi = (fin - debut) / (2 * (len(valeurs) - 1)) if len(valeurs) > 1 and fin != debut else 0.5
+    return [debut - demi, fin + demi]
+
+
+def render_chart_png(resultat_net, caf, autofinancement, dpi=150):
+    # Rendu hors écran dans un tampon mémoire: aucun fichier partagé entre exports
+    figure = Figure(figsize=(5, 4), dpi=100, tight_layout=True)
+    FigureCanvasAgg(figure)
+    CafChart(figure).update(resultat_net, caf, autofinancement)
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', bbox_inches='tight', dpi=dpi)
+    return buffer.getvalue()
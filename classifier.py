@@ -0,0 +1,69 @@
+"""Classement des comptes PCN par préfixe, compilé en table de correspondance."""
+import numpy as np
+
+# Au-delà, la table dépasserait le million d'entrées
+PROFONDEUR_MAX = 6
+
+
+class PrefixClassifier:
+    # Les règles (préfixe, catégorie) sont compilées une fois pour toutes dans une
+    # table indexée par les premiers chiffres du compte: le classement coûte une
+    # seule lecture de tableau par compte, quel que soit le nombre de règles.
+    # En cas de chevauchement (681 et 6816), le préfixe le plus long l'emporte.
+
+    def __init__(self, regles, categories=None):
+        if categories is None:
+            categories = ['autre']
+            for _, categorie in regles:
+                if categorie not in categories:
+                    categories.append(categorie)
+        self.categories = list(categories)
+
+        self.prefixes = {}
+        for prefixe, categorie in regles:
+            prefixe = str(prefixe).strip()
+            if not prefixe.isdigit():
+                raise ValueError(f"Préfixe de compte invalide: {prefixe!r}")
+            if len(prefixe) > PROFONDEUR_MAX:
+                raise ValueError(f"Préfixe trop long (max {PROFONDEUR_MAX} chiffres): {prefixe}")
+            if categorie not in self.categories:
+                raise ValueError(f"Catégorie inconnue: {categorie!r}")
+            # À préfixe identique, la première règle est conservée
+            self.prefixes.setdefault(prefixe, self.categories.index(categorie))
+
+        self.profondeur = max([len(p) for p in self.prefixes] + [1])
+        self.table = np.zeros(10 ** self.profondeur, dtype=np.int16)
+        for prefixe in sorted(self.prefixes, key=len):
+            pas = 10 ** (self.profondeur - len(prefixe))
+            debut = int(prefixe) * pas
+            self.table[debut:debut + pas] = self.prefixes[prefixe]
+
+    def classify_code(self, compte):
+        # Chemin lent, réservé aux comptes courts ou non numériques
+        compte = str(compte).strip()
+        for longueur in range(min(len(compte), self.profondeur), 0, -1):
+            categorie = self.prefixes.get(compte[:longueur])
+            if categorie is not None:
+                return categorie
+        return 0
+
+    def classify_unique(self, comptes):
+        # Classe un tableau de chaînes supposées déjà distinctes et normalisées
+        comptes = np.asarray(comptes, dtype=str)
+        ids = np.zeros(len(comptes), dtype=np.int16)
+        if not len(comptes):
+            return ids
+
+        tetes = comptes.astype(f'U{self.profondeur}')
+        rapide = (np.char.str_len(comptes) >= self.profondeur) & np.char.isdigit(tetes)
+        ids[rapide] = self.table[tetes[rapide].astype(np.int64)]
+        for i in np.flatnonzero(~rapide):
+            ids[i] = self.classify_code(comptes[i])
+        return ids
+
+    def classify(self, comptes):
+        # Un grand livre contient peu de comptes distincts: on classe les valeurs uniques
+        import pandas as pd
+
+        codes, uniques = pd.factorize(np.asarray(comptes, dtype=str))
+        return self.classify_unique(uniques)[codes]
@@ -0,0 +1,256 @@
+"""Consolidation de la CAF sur l'arbre des entités d'un groupe (holding, filiales, unités)."""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from batch import check_output, load_totals, write_summary
+from engine import CATEGORIES, compute_from_totals, parse_centime
+from pools import run_jobs
+
+# Totaux tenus par entité: catégories de la CAF puis dividendes, en centimes
+COLONNES_TOTAUX = CATEGORIES + ['dividendes']
+DIVIDENDES = len(CATEGORIES)
+
+COLONNES = (
+    ['entite', 'parent', 'niveau', 'fichier', 'lignes']
+    + CATEGORIES[1:]
+    + ['caf', 'dividendes', 'autofinancement', 'incomplet', 'erreur']
+)
+
+
+class Consolidation:
+    # Chaque entité a ses totaux propres (son grand livre) et un sous-total en cache:
+    # ses totaux plus ceux de tous ses descendants. rollup() calcule tous les sous-totaux
+    # niveau par niveau; ensuite, set_totals() ne reporte que l'écart sur les ancêtres.
+
+    def __init__(self):
+        self.entites = []
+        self.index = {}
+        self.parent_ids = []
+        self.fichiers = []
+        self.lignes = []
+        self.erreurs = {}
+        self._propres = np.zeros((0, len(COLONNES_TOTAUX)), dtype=np.int64)
+        self._parents = None
+        self._niveaux = None
+        self._cumuls = None
+
+    def __len__(self):
+        return len(self.entites)
+
+    def add_entity(self, entite, parent=None, fichier=None, dividendes=0):
+        # Le parent peut être déclaré après l'enfant: l'arbre est vérifié par rollup()
+        if entite in self.index:
+            raise ValueError(f"Entité en double: {entite}")
+        self.index[entite] = len(self.entites)
+        self.entites.append(entite)
+        self.parent_ids.append(parent or None)
+        self.fichiers.append(fichier or None)
+        self.lignes.append(None)
+
+        if len(self.entites) > len(self._propres):
+            agrandi = np.zeros((max(16, 2 * len(self._propres)), len(COLONNES_TOTAUX)), dtype=np.int64)
+            agrandi[:len(self._propres)] = self._propres
+            self._propres = agrandi
+        self._propres[len(self.entites) - 1, DIVIDENDES] = int(dividendes)
+        self._cumuls = None
+
+    def set_totals(self, entite, totals, dividendes=None):
+        # totals: catégories de la CAF en centimes; dividendes inchangés si None
+        i = self.index[entite]
+        ligne = self._propres[i].copy()
+        ligne[:DIVIDENDES] = totals
+        if dividendes is not None:
+            ligne[DIVIDENDES] = int(dividendes)
+        ecart = ligne - self._propres[i]
+        self._propres[i] = ligne
+
+        if self._cumuls is not None:
+            # Seuls l'entité et ses ancêtres changent (entiers: pas de dérive d'arrondi)
+            while i >= 0:
+                self._cumuls[i] += ecart
+                i = self._parents[i]
+
+    def _check_tree(self):
+        n = len(self.entites)
+        parents = np.full(n, -1, dtype=np.int64)
+        for i, parent in enumerate(self.parent_ids):
+            if parent is not None:
+                if parent not in self.index:
+                    raise ValueError(f"Parent inconnu pour {self.entites[i]}: {parent}")
+                parents[i] = self.index[parent]
+
+        niveaux = np.full(n, -1, dtype=np.int64)
+        for i in range(n):
+            chemin = []
+            j = i
+            while j >= 0 and niveaux[j] < 0:
+                if j in chemin:
+                    raise ValueError(f"Cycle dans l'arbre des entités: {self.entites[j]}")
+                chemin.append(j)
+                j = parents[j]
+            base = niveaux[j] if j >= 0 else -1
+            for k in reversed(chemin):
+                base += 1
+                niveaux[k] = base
+        return parents, niveaux
+
+    def rollup(self):
+        # Du niveau le plus profond vers les racines: chaque niveau s'ajoute à ses parents
+        self._parents, self._niveaux = self._check_tree()
+        cumuls = self._propres[:len(self.entites)].copy()
+        for niveau in range(int(self._niveaux.max(initial=0)), 0, -1):
+            noeuds = np.flatnonzero(self._niveaux == niveau)
+            np.add.at(cumuls, self._parents[noeuds], cumuls[noeuds])
+        self._cumuls = cumuls
+        return self
+
+    def totals(self, entite):
+        if self._cumuls is None:
+            self.rollup()
+        return self._cumuls[self.index[entite]].copy()
+
+    def results(self, entite):
+        totals = self.totals(entite)
+        return compute_from_totals(totals[:DIVIDENDES], totals[DIVIDENDES])
+
+    def ancestors(self, entite):
+        if self._cumuls is None:
+            self.rollup()
+        i = self._parents[self.index[entite]]
+        ancetres = []
+        while i >= 0:
+            ancetres.append(self.entites[i])
+            i = self._parents[i]
+        return ancetres
+
+    def load_ledgers(self, workers=None, progress=None):
+        # Un grand livre par entité qui en déclare un; les erreurs restent par entité
+        jobs = [(entite, (fichier,)) for entite, fichier in zip(self.entites, self.fichiers) if fichier]
+        for entite, (lignes, totals, erreur) in run_jobs(
+            load_totals, jobs, workers, progress, echec=lambda entite, erreur: (None, None, erreur)
+        ):
+            self.lignes[self.index[entite]] = lignes
+            if erreur:
+                self.erreurs[entite] = erreur
+            else:
+                self.erreurs.pop(entite, None)
+                self.set_totals(entite, totals)
+
+    def reload(self, entite):
+        # Relit le grand livre d'une seule entité; seuls ses ancêtres sont recalculés
+        lignes, totals, erreur = load_totals(self.fichiers[self.index[entite]])
+        self.lignes[self.index[entite]] = lignes
+        if erreur:
+            self.erreurs[entite] = erreur
+            raise ValueError(erreur)
+        self.erreurs.pop(entite, None)
+        self.set_totals(entite, totals)
+
+    def _tree_order(self):
+        # Parcours en profondeur, dans l'ordre de déclaration des entités
+        enfants = [[] for _ in self.entites]
+        racines = []
+        for i, parent in enumerate(self._parents):
+            (enfants[parent] if parent >= 0 else racines).append(i)
+        ordre = []
+        pile = list(reversed(racines))
+        while pile:
+            i = pile.pop()
+            ordre.append(i)
+            pile.extend(reversed(enfants[i]))
+        return ordre
+
+    def summary(self):
+        import pandas as pd
+
+        if self._cumuls is None:
+            self.rollup()
+        # Un sous-total est incomplet si une entité de son sous-arbre n'a pas pu être lue
+        incompletes = set()
+        for entite in self.erreurs:
+            incompletes.add(entite)
+            incompletes.update(self.ancestors(entite))
+
+        lignes = []
+        for i in self._tree_order():
+            entite = self.entites[i]
+            ligne = {
+                'entite': entite,
+                'parent': self.parent_ids[i] or '',
+                'niveau': int(self._niveaux[i]),
+                'fichier': self.fichiers[i] or '',
+                'lignes': self.lignes[i],
+                'incomplet': entite in incompletes,
+                'erreur': self.erreurs.get(entite, ''),
+            }
+            ligne.update(compute_from_totals(self._cumuls[i, :DIVIDENDES], self._cumuls[i, DIVIDENDES]))
+            lignes.append(ligne)
+        return pd.DataFrame(lignes, columns=COLONNES).astype({'lignes': 'Int64'})
+
+
+def read_tree(chemin):
+    # CSV: entite, parent (vide pour la racine), fichier (grand livre, facultatif), dividendes
+    # (facultatif). Les chemins relatifs partent du dossier du fichier d'arbre.
+    import pandas as pd
+
+    arbre = pd.read_csv(chemin, dtype=str, keep_default_na=False, sep=None, engine='python')
+    arbre.columns = [str(col).strip().lower() for col in arbre.columns]
+    if 'entite' not in arbre.columns:
+        raise ValueError("Colonne requise non trouvée: 'entite'")
+
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    consolidation = Consolidation()
+    for ligne in arbre.to_dict('records'):
+        fichier = ligne.get('fichier', '').strip()
+        consolidation.add_entity(
+            ligne['entite'].strip(),
+            ligne.get('parent', '').strip() or None,
+            os.path.join(dossier, fichier) if fichier else None,
+            parse_centime(ligne.get('dividendes', '')),
+        )
+    return consolidation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidation de la CAF sur l'arbre des entités d'un groupe")
+    parser.add_argument('arbre', help="CSV des entités: entite, parent, fichier, dividendes")
+    parser.add_argument('-o', '--output', default='consolidation_caf.csv', help="Fichier de synthèse (.csv ou .parquet)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus (défaut: tous les cœurs)")
+    args = parser.parse_args(argv)
+
+    def progress(fait, total):
+        print(f"\r{fait}/{total} grands livres lus", end='', file=sys.stderr)
+
+    try:
+        check_output(args.output)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    debut = time.perf_counter()
+    try:
+        consolidation = read_tree(args.arbre)
+        consolidation.load_ledgers(args.workers, progress)
+        lecture = time.perf_counter()
+        consolidation.rollup()
+        consolidation_s = time.perf_counter() - lecture
+        write_summary(consolidation.summary(), args.output)
+    except Exception:
+        print(f"\nErreur complète:\n{traceback.format_exc()}", file=sys.stderr)
+        return 1
+
+    print(
+        f"\n{len(consolidation)} entités en {time.perf_counter() - debut:.1f} s "
+        f"(consolidation {consolidation_s * 1000:.1f} ms, {len(consolidation.erreurs)} en erreur) -> {args.output}",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Moteur de calcul de la CAF, utilisable sans interface graphique."""
+from functools import lru_cache
+
+import numpy as np
+
+from classifier import PrefixClassifier
+
+# Catégories du tableau de CAF (l'indice 0 regroupe les comptes non retenus)
+CATEGORIES = [
+    'autre',
+    'resultat_net',
+    'dotations',
+    'valeur_cession',
+    'reprises',
+    'produits_cession',
+    'subventions',
+]
+
+# Préfixes PCN -> catégorie (un préfixe plus long, ex. 6816, prime sur 681)
+REGLES_CAF = [
+    ('12', 'resultat_net'),
+    ('681', 'dotations'),
+    ('686', 'dotations'),
+    ('687', 'dotations'),
+    ('675', 'valeur_cession'),
+    ('781', 'reprises'),
+    ('786', 'reprises'),
+    ('787', 'reprises'),
+    ('775', 'produits_cession'),
+    ('777', 'subventions'),
+]
+
+# Signe de chaque catégorie dans la CAF (méthode additive)
+SIGNES_CAF = np.array([0, 1, 1, 1, -1, -1, -1], dtype=np.int64)
+
+# Les montants sont tenus en centimes entiers (int64): les sommes sont exactes
+CENTIMES = 100
+
+# Écritures régionales: seuls les chiffres, les séparateurs "." et ",", les signes et l'exposant
+# ("1.5E+06") comptent. Sans séparateur décimal connu:
+# - "." et "," présents: le dernier est décimal ("1 234 567,89", "1,234,567.89", "1.234,5");
+# - un seul des deux: il sépare les milliers seulement s'il ne suit que des groupes de
+#   3 chiffres, après 1 à 3 chiffres ne commençant pas par 0 ("1,234", "1.234.567");
+#   sinon il est décimal ("0.005", "3,14159", "12.3456"), arrondi au centime.
+# Avec decimal="," (ou "."), l'autre est toujours un millier.
+CHIFFRES_MAX = 18
+PUISSANCES_10 = 10 ** np.arange(CHIFFRES_MAX + 1, dtype=np.int64)
+
+
+def _normalize_unique(comptes):
+    import pandas as pd
+
+    normalises = []
+    for compte in comptes:
+        if compte is None or (not isinstance(compte, str) and pd.isna(compte)):
+            normalises.append('')
+        elif isinstance(compte, (float, np.floating)) and float(compte).is_integer():
+            normalises.append(str(int(compte)))
+        else:
+            normalises.append(str(compte).strip())
+    return np.array(normalises, dtype=str)
+
+
+def normalize_comptes(comptes):
+    # Ramène les comptes à des chaînes sans espaces (681.0 -> "681"), valeur distincte par valeur distincte
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(comptes, copy=False), use_na_sentinel=False)
+    return _normalize_unique(uniques)[codes]
+
+
+def _centimes_nombres(valeurs):
+    # Valeurs non finies ou hors de l'int64 -> 0
+    centimes = valeurs * CENTIMES
+    lisibles = np.isfinite(centimes) & (np.abs(centimes) < 2.0 ** 63)
+    return np.rint(np.where(lisibles, centimes, 0.0)).astype(np.int64)
+
+
+def _centimes_textes(textes, decimal=None):
+    # Lecture vectorisée colonne de caractères par colonne de caractères, sans expression régulière
+    caracteres = np.asarray(textes, dtype=object).astype(str)
+    largeur = caracteres.dtype.itemsize // 4
+    # Une ligne par position de caractère: chaque passe lit un tableau contigu
+    codes = np.ascontiguousarray(caracteres.view(np.uint32).reshape(len(caracteres), largeur).T)
+
+    n = len(caracteres)
+    valeurs = np.zeros(n, dtype=np.int64)
+    nombre_chiffres = np.zeros(n, dtype=np.int64)
+    premier_chiffre = np.full(n, -1, dtype=np.int64)
+    # Chiffres depuis le dernier séparateur, et avant le premier
+    apres_separateur = np.zeros(n, dtype=np.int64)
+    premier_groupe = np.zeros(n, dtype=np.int64)
+    separateurs = np.zeros(n, dtype=np.int64)
+    points = np.zeros(n, dtype=np.int64)
+    groupes_de_3 = np.ones(n, dtype=bool)
+    exposant = np.zeros(n, dtype=np.int64)
+    dans_exposant = np.zeros(n, dtype=bool)
+    exposant_negatif = np.zeros(n, dtype=bool)
+    negatif = np.zeros(n, dtype=bool)
+    decimaux = (ord('.'), ord(',')) if decimal is None else (ord(decimal), ord(decimal))
+    for j in range(largeur):
+        code = codes[j]
+        chiffre = (code >= ord('0')) & (code <= ord('9'))
+        valeur_chiffre = code.astype(np.int64) - ord('0')
+        mantisse = chiffre & ~dans_exposant
+        valeurs = np.where(mantisse, valeurs * 10 + valeur_chiffre, valeurs)
+        premier_chiffre = np.where(mantisse & (nombre_chiffres == 0), valeur_chiffre, premier_chiffre)
+        nombre_chiffres += mantisse
+        exposant = np.where(chiffre & dans_exposant, np.minimum(exposant * 10 + valeur_chiffre, 99), exposant)
+
+        # Négatifs: "-1 234", "1 234-", "−1 234" ou "(1 234)"; après "e", le signe est celui de l'exposant
+        moins = (code == ord('-')) | (code == ord('\u2212'))
+        exposant_negatif |= moins & dans_exposant
+        negatif |= (moins | (code == ord('('))) & ~dans_exposant
+
+        est_separateur = ((code == decimaux[0]) | (code == decimaux[1])) & ~dans_exposant
+        groupes_de_3 &= ~est_separateur | (separateurs == 0) | (apres_separateur == 3)
+        premier_groupe = np.where(est_separateur & (separateurs == 0), nombre_chiffres, premier_groupe)
+        separateurs += est_separateur
+        points += est_separateur & (code == ord('.'))
+        apres_separateur = np.where(est_separateur, 0, apres_separateur + mantisse)
+        dans_exposant |= ((code == ord('e')) | (code == ord('E'))) & (nombre_chiffres > 0)
+
+    if decimal is None:
+        deux_sortes = (points > 0) & (points < separateurs)
+        milliers = (
+            ~deux_sortes & groupes_de_3 & (apres_separateur == 3)
+            & (premier_groupe >= 1) & (premier_groupe <= 3) & (premier_chiffre != 0)
+        )
+        decimales = np.where((separateurs > 0) & ~milliers, apres_separateur, 0)
+    else:
+        decimales = np.where(separateurs > 0, apres_separateur, 0)
+
+    # Montant = valeurs × 10^puissance centimes; puissance < 0: arrondi au centime le plus proche
+    puissance = 2 - decimales + np.where(exposant_negatif, -exposant, exposant)
+    reduction = np.clip(-puissance, 0, CHIFFRES_MAX)
+    centimes = np.where(
+        puissance >= 0,
+        valeurs * PUISSANCES_10[np.clip(puissance, 0, CHIFFRES_MAX)],
+        (valeurs + PUISSANCES_10[reduction] // 2) // PUISSANCES_10[reduction]
+    )
+    centimes = np.where(puissance < -CHIFFRES_MAX, 0, centimes)
+    # Au-delà de CHIFFRES_MAX chiffres le montant est illisible (0), comme une cellule vide
+    lisible = (nombre_chiffres <= CHIFFRES_MAX) & (nombre_chiffres + puissance <= CHIFFRES_MAX)
+    centimes = np.where(lisible, centimes, 0)
+    return np.where(negatif, -centimes, centimes)
+
+
+def parse_centimes(montants, decimal=None):
+    # Montants exacts en centimes (int64), quel que soit le format régional du texte
+    # (decimal: séparateur décimal détecté pour le fichier, voir ledger_io.sniff_csv)
+    import pandas as pd
+
+    serie = pd.Series(montants, copy=False)
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        serie = serie.astype(np.int64)
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return serie.to_numpy(dtype=np.int64) * CENTIMES
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return _centimes_nombres(serie.to_numpy(dtype=np.float64))
+
+    # Colonne mixte (cellules Excel numériques et texte): le texte n'est jamais lu en float
+    est_texte = serie.map(lambda valeur: isinstance(valeur, str)).to_numpy(dtype=bool)
+    centimes = np.zeros(len(serie), dtype=np.int64)
+    if not est_texte.all():
+        nombres = pd.to_numeric(serie[~est_texte], errors='coerce')
+        centimes[~est_texte] = _centimes_nombres(nombres.to_numpy(dtype=np.float64))
+    if est_texte.any():
+        centimes[est_texte] = _centimes_textes(serie[est_texte], decimal)
+    return centimes
+
+
+def parse_centime(text):
+    return int(parse_centimes([text])[0])
+
+
+def format_centimes(centimes, milliers=','):
+    # Formatage exact, sans passer par un float: 123456789 -> "1,234,567.89"
+    entier, reste = divmod(abs(int(centimes)), CENTIMES)
+    signe = '-' if centimes < 0 else ''
+    return f"{signe}{entier:,}.{reste:02d}".replace(',', milliers)
+
+
+@lru_cache(maxsize=32)
+def _compiled(regles):
+    return PrefixClassifier(regles, CATEGORIES)
+
+
+def get_classifier(regles=REGLES_CAF):
+    # Les tables de correspondance sont compilées une seule fois par jeu de règles
+    return _compiled(tuple(tuple(regle) for regle in regles))
+
+
+def classify_comptes(comptes, regles=REGLES_CAF):
+    # Normalisation et classement ne portent que sur les comptes distincts
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(comptes, copy=False), use_na_sentinel=False)
+    return get_classifier(regles).classify_unique(_normalize_unique(uniques))[codes]
+
+
+def sum_by_category(categories, centimes):
+    # Somme entière par catégorie (np.bincount passerait par des float64)
+    totals = np.zeros(len(CATEGORIES), dtype=np.int64)
+    np.add.at(totals, categories, np.asarray(centimes, dtype=np.int64))
+    return totals
+
+
+def category_totals(comptes, montants, regles=REGLES_CAF):
+    # Totaux par catégorie en centimes
+    categories = classify_comptes(comptes, regles)
+    centimes = parse_centimes(montants)
+    if len(categories) != len(centimes):
+        raise ValueError("Les colonnes compte et montant n'ont pas la même longueur")
+
+    return sum_by_category(categories, centimes)
+
+
+def compute_from_totals(totals, dividendes=0):
+    # totals et dividendes en centimes; les résultats sont rendus en DZD
+    totals = np.asarray(totals, dtype=np.int64)
+    resultats = {nom: int(totals[i]) / CENTIMES for i, nom in enumerate(CATEGORIES) if i > 0}
+
+    caf = int(totals @ SIGNES_CAF)
+    dividendes = int(dividendes)
+    resultats['caf'] = caf / CENTIMES
+    resultats['dividendes'] = dividendes / CENTIMES
+    resultats['autofinancement'] = (caf - dividendes) / CENTIMES
+    return resultats
+
+
+def compute_caf(comptes, montants, dividendes=0, regles=REGLES_CAF):
+    return compute_from_totals(category_totals(comptes, montants, regles), dividendes)
+
+
+def compute_caf_frame(df, compte_col='compte', montant_col='montant', dividendes=0):
+    return compute_caf(df[compte_col], df[montant_col], dividendes)
@@ -0,0 +1,139 @@
+"""Mesure légère des étapes (durée, lignes, mémoire) journalisée en JSON lines."""
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def default_log_path():
+    return os.environ.get('CAF_LOG_FILE') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'calculateur-autofinancement', 'etapes.jsonl'
+    )
+
+
+def peak_memory_mb():
+    # Pic de mémoire résidente du processus depuis son démarrage
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return round(pic / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Instrumentation:
+    # span() chronomètre une étape nommée et écrit une ligne JSON par étape terminée.
+    # Avec profile=True, chaque profiled() alimente un cProfile fusionné par dump_profile().
+
+    def __init__(self, log_path=None, profile=False, session=None):
+        self.log_path = log_path
+        self.profile = profile
+        self.session = session or datetime.now().strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}"
+        self.listeners = []
+        self.last = {}
+        self._profils = []
+        self._verrou = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        # Le bloc peut compléter attrs (ex. span['rows'] = n) avant la fin de l'étape
+        attrs = dict(attrs)
+        memoire_avant = peak_memory_mb()
+        debut = time.perf_counter()
+        statut = 'ok'
+        try:
+            yield attrs
+        except BaseException as e:
+            statut = type(e).__name__
+            raise
+        finally:
+            self.mark(name, debut, statut, memoire_avant, **attrs)
+
+    def mark(self, name, debut, statut='ok', memoire_avant=None, **attrs):
+        # Étape commencée à debut (time.perf_counter()) et terminée maintenant
+        pic = peak_memory_mb()
+        self.record({
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'session': self.session,
+            'stage': name,
+            'seconds': round(time.perf_counter() - debut, 6),
+            'status': statut,
+            'thread': threading.current_thread().name,
+            'peak_mb': pic,
+            'peak_delta_mb': None if pic is None or memoire_avant is None else round(pic - memoire_avant, 1),
+            **attrs,
+        })
+
+    def record(self, enregistrement):
+        with self._verrou:
+            self.last[enregistrement['stage']] = enregistrement
+            self._write(enregistrement)
+        for listener in list(self.listeners):
+            listener(enregistrement)
+
+    def _write(self, enregistrement):
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(enregistrement, ensure_ascii=False, default=str) + '\n')
+        except OSError:
+            # La journalisation ne doit jamais faire échouer un traitement
+            pass
+
+    def summary(self, stages=None):
+        parties = []
+        for nom in stages or self.last:
+            enregistrement = self.last.get(nom)
+            if enregistrement is None:
+                continue
+            secondes = enregistrement['seconds']
+            duree = f"{secondes * 1000:.0f} ms" if secondes < 1 else f"{secondes:.1f} s"
+            if enregistrement.get('rows') is not None:
+                duree += f" ({enregistrement['rows']:,} lignes)".replace(",", " ")
+            parties.append(f"{nom} {duree}")
+        return " · ".join(parties)
+
+    @contextmanager
+    def profiled(self):
+        # cProfile ne suit que le thread courant: un profil par tâche, fusionnés à la fin
+        if not self.profile:
+            yield
+            return
+        profil = cProfile.Profile()
+        profil.enable()
+        try:
+            yield
+        finally:
+            profil.disable()
+            with self._verrou:
+                self._profils.append(profil)
+
+    def dump_profile(self, path=None):
+        with self._verrou:
+            profils = list(self._profils)
+        if not profils:
+            return None
+        path = path or os.path.join(
+            os.path.dirname(os.path.abspath(self.log_path or default_log_path())),
+            f"profil-{self.session}.prof"
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pstats.Stats(*profils).dump_stats(path)
+        return path
+
+
+instrumentation = Instrumentation(
+    log_path=default_log_path(),
+    profile=os.environ.get('CAF_PROFILE', '') not in ('', '0'),
+)
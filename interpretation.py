@@ -0,0 +1,89 @@
+"""Interprétation textuelle (HTML) des indicateurs de CAF."""
+
+
+def get_interpretation(resultat_net, caf, autofinancement, dividendes):
+    interpretations = []
+
+    # Analyse du résultat net
+    if resultat_net > 0:
+        interpretations.append(
+            "🔹 <b>Résultat Net Positif</b> ({} DZD):\n"
+            "L'entreprise dégage un bénéfice. Cela indique que les produits dépassent les charges, "
+            "ce qui est un signe de bonne santé financière à court terme.".format(f"{resultat_net:,.2f}")
+        )
+    else:
+        interpretations.append(
+            "🔹 <b>Résultat Net Négatif</b> ({} DZD):\n"
+            "L'entreprise est en situation de perte. Cela peut être préoccupant si la tendance persiste, "
+            "mais peut être normal pour une entreprise en phase d'investissement ou de démarrage.".format(f"{resultat_net:,.2f}")
+        )
+
+    # Analyse de la CAF
+    if caf > resultat_net:
+        cash_info = "La CAF est supérieure au résultat net, ce qui est normal car elle inclut les dotations non décaissables."
+    elif caf == resultat_net:
+        cash_info = "La CAF est égale au résultat net, ce qui est rare et peut indiquer l'absence de dotations."
+    else:
+        cash_info = "La CAF est inférieure au résultat net, situation atypique qui mérite investigation."
+
+    if caf > 0:
+        interpretations.append(
+            "🔹 <b>CAF Positive</b> ({} DZD):\n"
+            "L'entreprise génère des liquidités internes suffisantes pour:\n"
+            "- Financer ses investissements\n"
+            "- Rembourser ses dettes\n"
+            "- Payer des dividendes\n{}".format(f"{caf:,.2f}", cash_info)
+        )
+    else:
+        interpretations.append(
+            "🔹 <b>CAF Négative</b> ({} DZD):\n"
+            "Attention! L'entreprise ne génère pas assez de cash flow interne.\n"
+            "Cela peut entraîner:\n"
+            "- Des difficultés de trésorerie\n"
+            "- Une dépendance accrue au financement externe\n"
+            "- Des risques de cessation de paiement".format(f"{caf:,.2f}")
+        )
+
+    # Analyse de l'autofinancement
+    if autofinancement > 0:
+        if dividendes > 0:
+            dividend_info = (
+                "L'entreprise peut à la fois:\n"
+                "- Financer sa croissance ({:,.2f} DZD disponibles)\n"
+                "- Récompenser ses actionnaires ({:,.2f} DZD de dividendes)".format(autofinancement, dividendes)
+            )
+        else:
+            dividend_info = "L'entreprise conserve toutes ses ressources pour financer son développement."
+
+        interpretations.append(
+            "🔹 <b>Autofinancement Positif</b> ({} DZD):\n"
+            "Situation très favorable. {}\n"
+            "La politique de dividendes semble soutenable.".format(f"{autofinancement:,.2f}", dividend_info)
+        )
+    else:
+        interpretations.append(
+            "🔹 <b>Autofinancement Négatif</b> ({} DZD):\n"
+            "Situation risquée! L'entreprise distribue plus de dividendes ({:,.2f} DZD) "
+            "qu'elle ne génère de CAF.\n"
+            "Cela peut conduire à:\n"
+            "- Un endettement excessif\n"
+            "- Une réduction des investissements\n"
+            "- A terme, une baisse de compétitivité".format(f"{autofinancement:,.2f}", dividendes)
+        )
+
+    # Recommandations globales
+    recommendations = []
+    if autofinancement < 0:
+        recommendations.append(
+            "🚩 <b>Recommandation urgente</b>: Réviser la politique de dividendes à la baisse "
+            "ou trouver des sources de financement externes."
+        )
+    elif caf < resultat_net:
+        recommendations.append(
+            "🔍 <b>Vérifier</b>: La composition de la CAF pour comprendre pourquoi elle est inférieure au résultat net."
+        )
+
+    if recommendations:
+        interpretations.append("\n<b>RECOMMANDATIONS:</b>\n" + "\n".join(recommendations))
+
+    return "<br>".join(interpretations).replace("\n", "<br>")
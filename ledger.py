@@ -0,0 +1,238 @@
+"""Stockage colonnaire du grand livre: quelques octets par ligne au lieu d'objets Qt."""
+from bisect import bisect_right
+from itertools import count
+
+import numpy as np
+
+from engine import CATEGORIES, REGLES_CAF, get_classifier, sum_by_category
+
+# Numéros uniques des états des comptes et des libellés du grand livre: les index de
+# ledger_filter.LedgerIndex ne sont reconstruits que si leur colonne a changé
+_revisions = count()
+
+
+class Vocabulaire:
+    # Valeurs distinctes d'une colonne texte; chaque ligne ne stocke qu'un code int32
+
+    def __init__(self, valeurs=None):
+        self.valeurs = list(valeurs) if valeurs else ['']
+        self.index = {valeur: code for code, valeur in enumerate(self.valeurs)}
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    def __getitem__(self, code):
+        return self.valeurs[code]
+
+    def code(self, valeur):
+        code = self.index.get(valeur)
+        if code is None:
+            code = len(self.valeurs)
+            self.valeurs.append(valeur)
+            self.index[valeur] = code
+        return code
+
+    def encode(self, valeurs):
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(valeurs, dtype=object, copy=False), use_na_sentinel=False)
+        correspondance = np.array([self.code(str(v)) for v in uniques], dtype=np.int32)
+        return correspondance[codes] if len(codes) else np.zeros(0, dtype=np.int32)
+
+
+class Ledger:
+
+    def __init__(self, regles=REGLES_CAF, capacite=1024):
+        self.regles = regles
+        self.clear(capacite)
+
+    def clear(self, capacite=1024):
+        self.comptes = Vocabulaire()
+        self.libelles = Vocabulaire()
+        self._compte_codes = np.zeros(capacite, dtype=np.int32)
+        self._libelle_codes = np.zeros(capacite, dtype=np.int32)
+        # Montants en centimes entiers: totaux exacts quel que soit le nombre de lignes
+        self._centimes = np.zeros(capacite, dtype=np.int64)
+        # Catégorie CAF de chaque compte du vocabulaire (jamais de chaîne reparsée)
+        self._categories = np.zeros(0, dtype=np.int16)
+        # Totaux par catégorie (centimes), tenus à jour par différence à chaque modification
+        self.totals = np.zeros(len(CATEGORIES), dtype=np.int64)
+        self.n = 0
+        self.comptes_revision = next(_revisions)
+        self.libelles_revision = next(_revisions)
+        # Feuille d'origine (import multi-feuilles): plages contiguës [(nom, début, fin)]
+        self.feuilles = []
+        self._debuts_feuilles = []
+        # Lignes modifiées et état du fichier de session depuis le dernier enregistrement (voir session.py)
+        self.modifiees = set()
+        self.enregistrement = None
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def compte_codes(self):
+        return self._compte_codes[:self.n]
+
+    @property
+    def libelle_codes(self):
+        return self._libelle_codes[:self.n]
+
+    @property
+    def centimes(self):
+        return self._centimes[:self.n]
+
+    def _reserve(self, n):
+        capacite = max(len(self._centimes), 1)
+        if n <= capacite:
+            return
+        while capacite < n:
+            capacite *= 2
+        for nom in ('_compte_codes', '_libelle_codes', '_centimes'):
+            ancien = getattr(self, nom)
+            nouveau = np.zeros(capacite, dtype=ancien.dtype)
+            nouveau[:self.n] = ancien[:self.n]
+            setattr(self, nom, nouveau)
+
+    def append(self, libelles, comptes, centimes):
+        # Colonnes déjà normalisées (voir ledger_io.normalize_columns)
+        centimes = np.asarray(centimes, dtype=np.int64)
+        debut, fin = self.n, self.n + len(centimes)
+        self._reserve(fin)
+        self._libelle_codes[debut:fin] = self.libelles.encode(libelles)
+        self._compte_codes[debut:fin] = self.comptes.encode(comptes)
+        self._centimes[debut:fin] = centimes
+        self.n = fin
+        self.comptes_revision = next(_revisions)
+        self.libelles_revision = next(_revisions)
+
+        categories = self.compte_categories()[self._compte_codes[debut:fin]]
+        self.totals += sum_by_category(categories, centimes)
+        return debut, fin
+
+    def load_encoded(self, libelles, libelle_codes, comptes, compte_codes, centimes):
+        # Remplace le contenu par des colonnes déjà encodées (cache, session)
+        self.clear(max(len(centimes), 1))
+        self.libelles = Vocabulaire(libelles)
+        self.comptes = Vocabulaire(comptes)
+        self.n = len(centimes)
+        self._libelle_codes[:self.n] = libelle_codes
+        self._compte_codes[:self.n] = compte_codes
+        self._centimes[:self.n] = centimes
+        self.comptes_revision = next(_revisions)
+        self.libelles_revision = next(_revisions)
+        self.recompute_totals()
+
+    def attach(self, libelles, libelle_codes, comptes, compte_codes, centimes, n, totals):
+        # Colonnes utilisées telles quelles comme stockage (ex. np.memmap d'une session):
+        # rien n'est copié ni relu, leur longueur sert de capacité
+        self.clear(1)
+        self.libelles = Vocabulaire(libelles)
+        self.comptes = Vocabulaire(comptes)
+        self._libelle_codes = libelle_codes
+        self._compte_codes = compte_codes
+        self._centimes = centimes
+        self.n = n
+        self.totals = np.array(totals, dtype=np.int64)
+        self.comptes_revision = next(_revisions)
+        self.libelles_revision = next(_revisions)
+
+    def reattach(self, compte_codes, libelle_codes, centimes):
+        # Même contenu, autre stockage (copie en mémoire, projection du fichier de session
+        # réécrit): vocabulaires, totaux et révisions restent valables
+        self._compte_codes = compte_codes
+        self._libelle_codes = libelle_codes
+        self._centimes = centimes
+
+    def append_frame(self, df):
+        debut, fin = self.append(df['libelle'].to_numpy(), df['compte'].to_numpy(), df['centimes'].to_numpy())
+        if 'feuille' in df.columns and fin > debut:
+            self.tag_sheets(df['feuille'].to_numpy(), debut)
+        return debut, fin
+
+    def tag_sheets(self, feuilles, debut):
+        # Une plage par suite de lignes de la même feuille, fusionnée avec la précédente si elle la prolonge
+        ruptures = np.flatnonzero(feuilles[1:] != feuilles[:-1]) + 1
+        for a, b in zip(np.r_[0, ruptures], np.r_[ruptures, len(feuilles)]):
+            nom, a, b = str(feuilles[a]), debut + int(a), debut + int(b)
+            if self.feuilles and self.feuilles[-1][0] == nom and self.feuilles[-1][2] == a:
+                self.feuilles[-1] = (nom, self.feuilles[-1][1], b)
+            else:
+                self.feuilles.append((nom, a, b))
+                self._debuts_feuilles.append(a)
+
+    def sheet(self, row):
+        # Les lignes ajoutées à la main après l'import n'ont pas de feuille
+        i = bisect_right(self._debuts_feuilles, row) - 1
+        if i >= 0 and row < self.feuilles[i][2]:
+            return self.feuilles[i][0]
+        return ''
+
+    def append_row(self, libelle='', compte='', centimes=0):
+        return self.append([libelle], [compte], [centimes])[0]
+
+    def libelle(self, row):
+        return self.libelles[self._libelle_codes[row]]
+
+    def compte(self, row):
+        return self.comptes[self._compte_codes[row]]
+
+    def montant(self, row):
+        # En centimes
+        return int(self._centimes[row])
+
+    def set_libelle(self, row, libelle):
+        self._libelle_codes[row] = self.libelles.code(str(libelle).strip())
+        self.modifiees.add(row)
+        self.libelles_revision = next(_revisions)
+
+    def set_compte(self, row, compte):
+        # Le montant passe de la catégorie de l'ancien compte à celle du nouveau
+        ancienne = self.category(row)
+        self._compte_codes[row] = self.comptes.code(str(compte).strip())
+        self.modifiees.add(row)
+        self.comptes_revision = next(_revisions)
+        nouvelle = self.category(row)
+        if nouvelle != ancienne:
+            self.totals[ancienne] -= self._centimes[row]
+            self.totals[nouvelle] += self._centimes[row]
+
+    def set_montant(self, row, centimes):
+        self.totals[self.category(row)] += centimes - self._centimes[row]
+        self._centimes[row] = centimes
+        self.modifiees.add(row)
+
+    def category(self, row):
+        code = self._compte_codes[row]
+        categories = self._categories
+        if code >= len(categories):
+            categories = self.compte_categories()
+        return categories[code]
+
+    def compte_categories(self):
+        # Le vocabulaire ne fait que croître: seuls les nouveaux comptes sont classés
+        deja = len(self._categories)
+        if deja < len(self.comptes):
+            nouveaux = get_classifier(self.regles).classify_unique(self.comptes.valeurs[deja:])
+            self._categories = np.concatenate([self._categories, nouveaux])
+        return self._categories
+
+    def categories(self):
+        return self.compte_categories()[self.compte_codes]
+
+    def category_totals(self):
+        return self.totals.copy()
+
+    def recompute_totals(self):
+        # Passe complète, pour resynchroniser les totaux incrémentaux
+        self.totals = sum_by_category(self.categories(), self.centimes)
+        return self.category_totals()
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({
+            'libelle': np.array(self.libelles.valeurs, dtype=object)[self.libelle_codes],
+            'compte': np.array(self.comptes.valeurs, dtype=object)[self.compte_codes],
+            'centimes': self.centimes.copy(),
+        })
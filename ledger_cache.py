@@ -0,0 +1,168 @@
+"""Cache disque des grands livres déjà importés, indexé par le contenu du fichier."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from ledger import Ledger
+
+# À incrémenter quand le format des entrées ou la lecture des fichiers change (montants,
+# séparateurs, ligne d'en-tête): les entrées produites par une version précédente sont relues
+FORMAT_CACHE = 3
+TAILLE_LECTURE = 1 << 20
+SEPARATEUR = '\x00'
+
+
+def default_cache_dir():
+    return os.environ.get('CAF_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'calculateur-autofinancement'
+    )
+
+
+def default_max_bytes():
+    return int(float(os.environ.get('CAF_CACHE_MAX_MO', 1024)) * 1024 * 1024)
+
+
+def file_digest(filepath):
+    h = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for bloc in iter(lambda: f.read(TAILLE_LECTURE), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _pack(valeurs):
+    return np.frombuffer(SEPARATEUR.join(valeurs).encode('utf-8'), dtype=np.uint8)
+
+
+def _unpack(blob):
+    return blob.tobytes().decode('utf-8').split(SEPARATEUR)
+
+
+class LedgerCache:
+    # Une entrée par contenu (<empreinte>.npz, colonnes typées non compressées).
+    # L'index associe chemin + mtime + taille à l'empreinte: un fichier déjà vu et
+    # inchangé est retrouvé sans être relu; un fichier copié ou simplement « touché »
+    # est rehaché puis retrouvé par son contenu. Éviction LRU (date d'accès = mtime
+    # de l'entrée) au-delà de taille_max octets.
+
+    def __init__(self, dossier=None, taille_max=None):
+        self.dossier = dossier or default_cache_dir()
+        self.taille_max = default_max_bytes() if taille_max is None else taille_max
+        self._verrou = threading.Lock()
+        os.makedirs(self.dossier, exist_ok=True)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.dossier, 'index.json')
+
+    def _entry_path(self, empreinte):
+        return os.path.join(self.dossier, f"{empreinte}.npz")
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        self._atomic_write(self._index_path, lambda f: f.write(json.dumps(index).encode('utf-8')))
+
+    def _atomic_write(self, chemin, ecrire):
+        # Écriture dans un fichier temporaire puis renommage: jamais d'entrée à moitié écrite
+        fd, temporaire = tempfile.mkstemp(dir=self.dossier, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                ecrire(f)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+
+    @staticmethod
+    def _stat_key(filepath):
+        st = os.stat(filepath)
+        return f"{os.path.abspath(filepath)}|{st.st_mtime_ns}|{st.st_size}"
+
+    def digest(self, filepath):
+        cle = self._stat_key(filepath)
+        with self._verrou:
+            empreinte = self._read_index().get(cle)
+        if empreinte is None:
+            empreinte = file_digest(filepath)
+            with self._verrou:
+                # Les clés des versions précédentes du même fichier sont oubliées
+                chemin = cle.rsplit('|', 2)[0] + '|'
+                index = {k: e for k, e in self._read_index().items() if not k.startswith(chemin)}
+                index[cle] = empreinte
+                self._write_index(index)
+        return empreinte
+
+    def get(self, filepath):
+        empreinte = self.digest(filepath)
+        chemin = self._entry_path(empreinte)
+        try:
+            with np.load(chemin) as donnees:
+                if int(donnees['format']) != FORMAT_CACHE:
+                    return None
+                ledger = Ledger()
+                ledger.load_encoded(
+                    _unpack(donnees['libelles']), donnees['libelle_codes'],
+                    _unpack(donnees['comptes']), donnees['compte_codes'],
+                    donnees['centimes'],
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Marque l'entrée comme récemment utilisée
+        os.utime(chemin)
+        return ledger
+
+    def put(self, filepath, ledger):
+        empreinte = self.digest(filepath)
+
+        def ecrire(f):
+            np.savez(
+                f,
+                format=np.array(FORMAT_CACHE),
+                libelles=_pack(ledger.libelles.valeurs),
+                libelle_codes=ledger.libelle_codes,
+                comptes=_pack(ledger.comptes.valeurs),
+                compte_codes=ledger.compte_codes,
+                centimes=ledger.centimes,
+            )
+
+        self._atomic_write(self._entry_path(empreinte), ecrire)
+        self.evict()
+
+    def evict(self):
+        with self._verrou:
+            entrees = []
+            for nom in os.listdir(self.dossier):
+                if nom.endswith('.npz'):
+                    st = os.stat(os.path.join(self.dossier, nom))
+                    entrees.append((st.st_mtime, st.st_size, nom))
+
+            total = sum(taille for _, taille, _ in entrees)
+            supprimees = set()
+            for _, taille, nom in sorted(entrees):
+                if total <= self.taille_max:
+                    break
+                os.remove(os.path.join(self.dossier, nom))
+                supprimees.add(nom[:-len('.npz')])
+                total -= taille
+
+            if supprimees:
+                index = self._read_index()
+                self._write_index({cle: e for cle, e in index.items() if e not in supprimees})
+
+    def clear(self):
+        with self._verrou:
+            for nom in os.listdir(self.dossier):
+                if nom.endswith('.npz') or nom == 'index.json':
+                    os.remove(os.path.join(self.dossier, nom))
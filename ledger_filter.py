@@ -0,0 +1,123 @@
+"""Index du grand livre pour filtrer le tableau: préfixe de compte, mots du libellé, montants, CAF."""
+import re
+import unicodedata
+
+import numpy as np
+
+# Borne haute d'une recherche par préfixe dans un tableau de chaînes trié
+FIN_PREFIXE = '\U0010ffff'
+MOTIF_MOT = re.compile(r'\w+')
+
+
+def words(texte):
+    # Mots en minuscules et sans accents: "Cession véhicule" -> ['cession', 'vehicule']
+    texte = unicodedata.normalize('NFKD', str(texte).lower())
+    return MOTIF_MOT.findall(''.join(c for c in texte if not unicodedata.combining(c)))
+
+
+def _prefix_range(tries, prefixe):
+    return np.searchsorted(tries, [prefixe, prefixe + FIN_PREFIXE])
+
+
+class LedgerIndex:
+    # Index construits à la première recherche puis gardés tant que leur colonne ne change pas
+    # (une saisie de montant ne les invalide pas):
+    # - lignes triées par compte: toutes les lignes d'un préfixe de compte forment une tranche;
+    # - mots des libellés distincts, triés pour une recherche par début de mot. Le vocabulaire
+    #   ne faisant que croître, seuls les nouveaux libellés sont découpés.
+    # Un filtre ne parcourt donc ni les lignes en Python ni les chaînes de chaque ligne.
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self._revision_comptes = None
+        self._revision_libelles = None
+        self._lignes_triees = None
+        self._rangs_tries = None
+        self._comptes_tries = None
+        self._vocabulaire = None
+        self._libelles_indexes = 0
+        self._mots = []
+        self._codes_mots = []
+        self._mots_tries = None
+        self._codes_tries = None
+
+    def _account_index(self):
+        ledger = self.ledger
+        if self._revision_comptes != ledger.comptes_revision:
+            comptes = np.array(ledger.comptes.valeurs, dtype=str)
+            ordre = np.argsort(comptes, kind='stable')
+            rangs = np.empty(len(comptes), dtype=np.int32)
+            rangs[ordre] = np.arange(len(comptes), dtype=np.int32)
+            rangs_lignes = rangs[ledger.compte_codes]
+            self._lignes_triees = np.argsort(rangs_lignes, kind='stable')
+            self._rangs_tries = rangs_lignes[self._lignes_triees]
+            self._comptes_tries = comptes[ordre]
+            self._revision_comptes = ledger.comptes_revision
+        return self._comptes_tries, self._rangs_tries, self._lignes_triees
+
+    def _label_index(self):
+        if self._revision_libelles == self.ledger.libelles_revision:
+            return self._mots_tries, self._codes_tries
+        libelles = self.ledger.libelles
+        if self._vocabulaire is not libelles:
+            # Nouveau vocabulaire (grand livre vidé, session ouverte)
+            self._vocabulaire = libelles
+            self._libelles_indexes = 0
+            self._mots, self._codes_mots = [], []
+            self._mots_tries = None
+        if self._mots_tries is None or self._libelles_indexes < len(libelles):
+            for code in range(self._libelles_indexes, len(libelles)):
+                for mot in set(words(libelles[code])):
+                    self._mots.append(mot)
+                    self._codes_mots.append(code)
+            self._libelles_indexes = len(libelles)
+            mots = np.array(self._mots, dtype=str)
+            ordre = np.argsort(mots, kind='stable')
+            self._mots_tries = mots[ordre]
+            self._codes_tries = np.array(self._codes_mots, dtype=np.int32)[ordre]
+        self._revision_libelles = self.ledger.libelles_revision
+        return self._mots_tries, self._codes_tries
+
+    def account_rows(self, prefixe):
+        # Lignes dont le compte commence par `prefixe`, dans l'ordre des comptes
+        comptes_tries, rangs_tries, lignes_triees = self._account_index()
+        debut, fin = np.searchsorted(rangs_tries, _prefix_range(comptes_tries, prefixe))
+        return lignes_triees[debut:fin]
+
+    def label_codes(self, texte):
+        # Masque des libellés distincts contenant un mot qui commence par chaque mot de `texte`
+        mots_tries, codes_tries = self._label_index()
+        masque = np.ones(len(self.ledger.libelles), dtype=bool)
+        for mot in words(texte):
+            debut, fin = _prefix_range(mots_tries, mot)
+            du_mot = np.zeros(len(masque), dtype=bool)
+            du_mot[codes_tries[debut:fin]] = True
+            masque &= du_mot
+        return masque
+
+    def rows(self, compte='', libelle='', minimum=None, maximum=None, caf=False):
+        # Indices croissants des lignes qui satisfont tous les critères (montants en centimes,
+        # bornes incluses); None si aucun critère n'est donné
+        ledger = self.ledger
+        masques = []
+        compte = str(compte).strip()
+        if compte:
+            masque = np.zeros(len(ledger), dtype=bool)
+            masque[self.account_rows(compte)] = True
+            masques.append(masque)
+        if words(libelle):
+            masques.append(self.label_codes(libelle)[ledger.libelle_codes])
+        if minimum is not None:
+            masques.append(ledger.centimes >= minimum)
+        if maximum is not None:
+            masques.append(ledger.centimes <= maximum)
+        if caf:
+            # Comptes classés dans une catégorie du tableau de CAF par les règles du calcul
+            masques.append((ledger.compte_categories() != 0)[ledger.compte_codes])
+        if not masques:
+            return None
+
+        masque = masques[0]
+        for autre in masques[1:]:
+            masque &= autre
+        return np.flatnonzero(masque)
@@ -0,0 +1,409 @@
+"""Lecture des balances et grands livres (Excel, CSV) sans interface graphique."""
+import codecs
+import csv
+import glob
+import io
+import os
+import re
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from engine import normalize_comptes, parse_centimes
+from pools import run_jobs
+
+EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# Nombre de lignes converties en colonnes typées à la fois
+TAILLE_BLOC = 50_000
+
+# Lignes examinées en tête de feuille pour trouver la ligne d'en-tête (titres, dates au-dessus)
+LIGNES_ENTETE_MAX = 30
+
+# Début de fichier examiné pour deviner l'encodage, le séparateur et la virgule décimale
+TAILLE_ECHANTILLON = 256 * 1024
+DELIMITEURS = ';,\t|'
+ENCODAGES_BOM = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_columns(columns):
+    # Détection des colonnes sur les noms normalisés (minuscules, sans espaces)
+    columns = [str(col).strip().lower() for col in columns]
+    compte_col = next((col for col in columns if 'compte' in col or 'numéro' in col or 'numero' in col), None)
+    montant_col = next((col for col in columns if 'montant' in col or 'valeur' in col), None)
+    libelle_col = next((col for col in columns if 'libellé' in col or 'libelle' in col or 'désignation' in col), None)
+    return compte_col, montant_col, libelle_col
+
+
+def require_columns(compte_col, montant_col):
+    if compte_col is None or montant_col is None:
+        raise ValueError("Colonnes requises non trouvées: besoin d'une colonne 'compte' et 'montant'")
+
+
+def normalize_columns(comptes, montants, libelles=None, decimal=None):
+    # Renvoie un DataFrame (libelle, compte, centimes) limité aux lignes ayant un compte
+    comptes = normalize_comptes(comptes)
+    valides = comptes != ''
+
+    if libelles is not None:
+        libelles = pd.Series(libelles, copy=False).fillna('').astype(str).str.strip().to_numpy()[valides]
+    else:
+        libelles = [''] * int(valides.sum())
+
+    return pd.DataFrame({
+        'libelle': libelles,
+        'compte': comptes[valides],
+        'centimes': parse_centimes(np.asarray(montants, dtype=object)[valides], decimal),
+    })
+
+
+def normalize_ledger(df):
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    compte_col, montant_col, libelle_col = detect_columns(df.columns)
+    require_columns(compte_col, montant_col)
+
+    return normalize_columns(
+        df[compte_col].to_numpy(),
+        df[montant_col].to_numpy(),
+        df[libelle_col].to_numpy() if libelle_col else None,
+    )
+
+
+def _open_workbook(filepath):
+    # Lecture seule et à la demande: aucune feuille n'est chargée à l'ouverture
+    if filepath.lower().endswith('.xls'):
+        import xlrd
+
+        return xlrd.open_workbook(filepath, on_demand=True)
+
+    from openpyxl import load_workbook
+
+    return load_workbook(filepath, read_only=True, data_only=True)
+
+
+def _close_workbook(classeur):
+    if hasattr(classeur, 'release_resources'):
+        classeur.release_resources()
+    else:
+        classeur.close()
+
+
+def _sheet_rows(classeur, feuille):
+    # Parcours ligne à ligne d'une feuille (indice ou nom) d'un classeur ouvert
+    if hasattr(classeur, 'sheet_by_name'):
+        nom = classeur.sheet_names()[feuille] if isinstance(feuille, int) else feuille
+        feuille = classeur.sheet_by_name(nom)
+        try:
+            for i in range(feuille.nrows):
+                yield feuille.row_values(i)
+        finally:
+            classeur.unload_sheet(nom)
+        return
+
+    feuille = classeur.worksheets[feuille] if isinstance(feuille, int) else classeur[feuille]
+    yield from feuille.iter_rows(values_only=True)
+
+
+def _sheet_sizes(classeur):
+    if hasattr(classeur, 'sheet_by_name'):
+        # Le nombre de lignes d'une feuille .xls n'est connu qu'après l'avoir chargée
+        return [(nom, 0) for nom in classeur.sheet_names()]
+    # max_row vient de la dimension déclarée par la feuille: rien n'est parcouru
+    return [(feuille.title, feuille.max_row or 0) for feuille in classeur.worksheets]
+
+
+def iter_sheet_rows(filepath, feuille=0):
+    # Sans charger le classeur en mémoire
+    classeur = _open_workbook(filepath)
+    try:
+        yield from _sheet_rows(classeur, feuille)
+    finally:
+        _close_workbook(classeur)
+
+
+def list_sheets(filepath):
+    # [(nom, nombre de lignes annoncé ou 0)] dans l'ordre du classeur
+    classeur = _open_workbook(filepath)
+    try:
+        return _sheet_sizes(classeur)
+    finally:
+        _close_workbook(classeur)
+
+
+def find_header(lignes):
+    # Consomme les lignes jusqu'à l'en-tête (parmi les LIGNES_ENTETE_MAX premières) et renvoie
+    # les indices des colonnes compte, montant et libellé
+    vide = True
+    for ligne in islice(lignes, LIGNES_ENTETE_MAX):
+        vide = False
+        colonnes = [str(col).strip().lower() if col is not None else '' for col in ligne]
+        compte_col, montant_col, libelle_col = detect_columns(colonnes)
+        if compte_col is not None and montant_col is not None and compte_col != montant_col:
+            return [colonnes.index(col) if col else None for col in (compte_col, montant_col, libelle_col)]
+    if vide:
+        raise ValueError("Le fichier est vide")
+    require_columns(None, None)
+
+
+def _iter_row_chunks(lignes, taille):
+    indices = find_header(lignes)
+
+    def colonne(bloc, i):
+        return [ligne[i] if i < len(ligne) else None for ligne in bloc]
+
+    while True:
+        bloc = list(islice(lignes, taille))
+        if not bloc:
+            break
+
+        i_compte, i_montant, i_libelle = indices
+        chunk = normalize_columns(
+            colonne(bloc, i_compte),
+            colonne(bloc, i_montant),
+            colonne(bloc, i_libelle) if i_libelle is not None else None,
+        )
+        chunk.attrs['lignes'] = len(bloc)
+        yield chunk
+
+
+def _iter_excel_chunks(filepath, taille):
+    return _iter_row_chunks(iter_sheet_rows(filepath), taille)
+
+
+def _sheet_frame(lignes, feuille):
+    chunks = list(_iter_row_chunks(lignes, TAILLE_BLOC))
+    df = pd.concat(chunks, ignore_index=True) if chunks else normalize_columns([], [])
+    df['feuille'] = feuille
+    return df
+
+
+def read_sheet(filepath, feuille):
+    return _sheet_frame(iter_sheet_rows(filepath, feuille), feuille)
+
+
+# Classeur ouvert une seule fois par processus de travail: l'ouverture (table des chaînes
+# partagées d'un .xlsx) coûterait sinon autant pour chaque petite feuille que sa lecture
+_classeur_processus = None
+
+
+def _open_process_workbook(filepath):
+    global _classeur_processus
+    _classeur_processus = _open_workbook(filepath)
+
+
+def _read_sheet_job(feuille, classeur=None):
+    # Ne lève jamais: une feuille sans en-tête reconnu est signalée, pas fatale
+    try:
+        return _sheet_frame(_sheet_rows(classeur or _classeur_processus, feuille), feuille), ''
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def iter_workbook_sheets(filepath, workers=None, progress=None):
+    # Toutes les feuilles d'un classeur, lues en parallèle (une feuille par tâche, les plus
+    # grandes d'abord) et rendues dans l'ordre du classeur: (nom, DataFrame ou None, erreur).
+    # progress(fait, total) par feuille lue.
+    classeur = _open_workbook(filepath)
+    try:
+        feuilles = _sheet_sizes(classeur)
+        workers = min(workers or os.cpu_count() or 1, len(feuilles))
+        if workers <= 1:
+            for i, (nom, _) in enumerate(feuilles):
+                resultat = _read_sheet_job(nom, classeur)
+                if progress:
+                    progress(i + 1, len(feuilles))
+                yield (nom, *resultat)
+            return
+    finally:
+        _close_workbook(classeur)
+
+    # Les feuilles terminées en avance attendent que celles qui les précèdent soient rendues
+    ordre = [nom for nom, _ in feuilles]
+    attente, suivante = {}, 0
+    for nom, resultat in run_jobs(
+        _read_sheet_job, [(nom, (nom,)) for nom, _ in sorted(feuilles, key=lambda feuille: -feuille[1])],
+        workers, progress, echec=lambda nom, erreur: (None, erreur), spawn=True,
+        initializer=_open_process_workbook, initargs=(filepath,),
+    ):
+        attente[nom] = resultat
+        while suivante < len(ordre) and ordre[suivante] in attente:
+            yield (ordre[suivante], *attente.pop(ordre[suivante]))
+            suivante += 1
+
+
+def read_workbook(filepath, workers=None, progress=None):
+    # Grand livre de toutes les feuilles, chaque ligne marquée du nom de sa feuille
+    # (colonne 'feuille'); df.attrs['ignorees'] = {feuille: erreur}
+    frames, ignorees = [], {}
+    for nom, df, erreur in iter_workbook_sheets(filepath, workers, progress):
+        if erreur:
+            ignorees[nom] = erreur
+        else:
+            frames.append(df)
+    if not frames:
+        raise ValueError("Aucune feuille exploitable: " + "; ".join(f"{nom}: {e}" for nom, e in ignorees.items()))
+    resultat = pd.concat(frames, ignore_index=True)
+    resultat['feuille'] = resultat['feuille'].astype('category')
+    resultat.attrs['ignorees'] = ignorees
+    return resultat
+
+
+def _detect_encoding(echantillon):
+    for bom, encodage in ENCODAGES_BOM:
+        if echantillon.startswith(bom):
+            return encodage
+    try:
+        # final=False: un caractère coupé en fin d'échantillon n'est pas une erreur
+        codecs.getincrementaldecoder('utf-8')().decode(echantillon, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # Exports Windows (Excel, logiciels comptables)
+        return 'cp1252'
+
+
+def _detect_decimal(montants, delimiteur):
+    # Un montant avec les deux séparateurs tranche (le dernier est décimal); sinon un
+    # séparateur suivi de 1 ou 2 chiffres en fin de valeur
+    virgule = point = 0
+    for montant in montants:
+        montant = montant.strip()
+        if ',' in montant and '.' in montant:
+            return ',' if montant.rfind(',') > montant.rfind('.') else '.'
+        virgule += bool(re.search(r'\d,\d{1,2}\)?-?$', montant))
+        point += bool(re.search(r'\d\.\d{1,2}\)?-?$', montant))
+    if virgule != point:
+        return ',' if virgule > point else '.'
+    # Pas d'indice: le point-virgule accompagne d'ordinaire la virgule décimale
+    return ',' if delimiteur == ';' else None
+
+
+def sniff_csv(filepath):
+    # Encodage, séparateur de colonnes, en-tête et virgule décimale, devinés sur le début du fichier
+    with open(filepath, 'rb') as f:
+        echantillon = f.read(TAILLE_ECHANTILLON)
+    encodage = _detect_encoding(echantillon)
+    texte = codecs.getincrementaldecoder(encodage)(errors='replace').decode(echantillon, final=False)
+    lignes = texte.splitlines()
+    if len(echantillon) == TAILLE_ECHANTILLON and len(lignes) > 1:
+        # Dernière ligne probablement tronquée
+        lignes = lignes[:-1]
+    if not lignes:
+        raise ValueError("Le fichier est vide")
+
+    extrait = '\n'.join(lignes[:200])
+    try:
+        delimiteur = csv.Sniffer().sniff(extrait, delimiters=DELIMITEURS).delimiter
+    except csv.Error:
+        delimiteur = max(DELIMITEURS, key=lignes[0].count)
+
+    lecteur = csv.reader(io.StringIO('\n'.join(lignes)), delimiter=delimiteur)
+    entete = next(lecteur)
+    colonnes = [str(col).strip().lower() for col in entete]
+    compte_col, montant_col, libelle_col = detect_columns(colonnes)
+    require_columns(compte_col, montant_col)
+    # Noms d'origine des colonnes retenues (pour ne lire qu'elles)
+    noms = [entete[colonnes.index(col)] if col else None for col in (compte_col, montant_col, libelle_col)]
+
+    i_montant = colonnes.index(montant_col)
+    montants = [ligne[i_montant] for ligne in lecteur if len(ligne) > i_montant]
+    return {
+        'encoding': encodage,
+        'delimiter': delimiteur,
+        'decimal': _detect_decimal(montants, delimiteur),
+        'columns': noms,
+        # Taille moyenne d'une ligne, pour convertir un nombre de lignes en octets
+        'octets_par_ligne': max(1, len(echantillon) // max(1, len(lignes))),
+    }
+
+
+def _iter_csv_arrow(f, format_csv, taille):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    colonnes = [nom for nom in format_csv['columns'] if nom is not None]
+    lecteur = pa_csv.open_csv(
+        f,
+        read_options=pa_csv.ReadOptions(
+            encoding=format_csv['encoding'], block_size=max(1 << 20, taille * format_csv['octets_par_ligne'])
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter=format_csv['delimiter']),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=colonnes,
+            column_types={nom: pa.string() for nom in colonnes},
+            strings_can_be_null=False,
+        ),
+    )
+    for lot in lecteur:
+        yield {nom: lot.column(nom).to_numpy(zero_copy_only=False) for nom in colonnes}, lot.num_rows
+
+
+def _iter_csv_pandas(f, format_csv, taille):
+    colonnes = [nom for nom in format_csv['columns'] if nom is not None]
+    lecteur = pd.read_csv(
+        f, sep=format_csv['delimiter'], encoding=format_csv['encoding'], usecols=colonnes,
+        dtype=str, na_filter=False, chunksize=taille,
+    )
+    for brut in lecteur:
+        yield {nom: brut[nom].to_numpy() for nom in colonnes}, len(brut)
+
+
+def _iter_csv_chunks(filepath, taille):
+    # Lecture en flux de seules colonnes utiles, avec pyarrow s'il est installé; chaque bloc
+    # indique la position atteinte dans le fichier (chunk.attrs['octets'])
+    format_csv = sniff_csv(filepath)
+    compte_nom, montant_nom, libelle_nom = format_csv['columns']
+    try:
+        import pyarrow.csv  # noqa: F401
+        lire = _iter_csv_arrow
+    except ImportError:
+        lire = _iter_csv_pandas
+
+    lues = 0
+    with open(filepath, 'rb') as f:
+        for colonnes, lignes in lire(f, format_csv, taille):
+            lues += lignes
+            chunk = normalize_columns(
+                colonnes[compte_nom],
+                colonnes[montant_nom],
+                colonnes[libelle_nom] if libelle_nom is not None else None,
+                format_csv['decimal'],
+            )
+            chunk.attrs['lignes'] = lignes
+            # Les lecteurs lisent en avance: la position est bornée par l'estimation en lignes
+            chunk.attrs['octets'] = min(f.tell(), lues * format_csv['octets_par_ligne'])
+            yield chunk
+
+
+def iter_ledger_chunks(filepath, taille=TAILLE_BLOC):
+    # Blocs normalisés de taille bornée; chunk.attrs['lignes'] = lignes lues dans le fichier
+    if filepath.lower().endswith('.csv'):
+        return _iter_csv_chunks(filepath, taille)
+    return _iter_excel_chunks(filepath, taille)
+
+
+def read_ledger(filepath):
+    chunks = list(iter_ledger_chunks(filepath))
+    if not chunks:
+        return normalize_columns([], [])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def list_ledger_files(inputs):
+    # Accepte des dossiers, des fichiers ou des motifs glob
+    fichiers = []
+    for entree in inputs:
+        if os.path.isdir(entree):
+            candidats = sorted(os.path.join(entree, nom) for nom in os.listdir(entree))
+        else:
+            candidats = sorted(glob.glob(entree)) or [entree]
+
+        fichiers.extend(
+            chemin for chemin in candidats
+            if chemin.lower().endswith(EXTENSIONS) and not os.path.basename(chemin).startswith('~$')
+        )
+    return fichiers
@@ -0,0 +1,136 @@
+"""Modèle Qt virtualisé au-dessus du stockage colonnaire du grand livre."""
+import numpy as np
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from engine import format_centimes, parse_centime
+from ledger import Ledger
+
+COLONNE_LIBELLE, COLONNE_COMPTE, COLONNE_MONTANT, COLONNE_FEUILLE = range(4)
+ENTETES = ["Libellé", "Compte", "Montant (DZD)"]
+# Colonne en lecture seule, affichée seulement après un import multi-feuilles
+ENTETE_FEUILLE = "Feuille"
+
+# data() est appelé pour chaque cellule peinte: on évite de reconstruire les énumérations Qt
+DISPLAY, EDIT, ALIGNEMENT = Qt.DisplayRole, Qt.EditRole, Qt.TextAlignmentRole
+ALIGNEMENT_MONTANT = int(Qt.AlignRight | Qt.AlignVCenter)
+
+
+class LedgerModel(QAbstractTableModel):
+    # La vue ne demande que les cellules visibles: aucune ligne n'est matérialisée d'avance
+
+    def __init__(self, ledger=None, parent=None):
+        super().__init__(parent)
+        self.ledger = ledger if ledger is not None else Ledger()
+        # Lignes du grand livre affichées quand un filtre est actif (voir set_filter)
+        self.lignes = None
+
+    def _row(self, row):
+        return row if self.lignes is None else int(self.lignes[row])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.ledger) if self.lignes is None else len(self.lignes)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(ENTETES) + 1 if self.ledger.feuilles else len(ENTETES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return ENTETES[section] if section < len(ENTETES) else ENTETE_FEUILLE
+        # Numéro de la ligne dans le grand livre, même filtré
+        return str(self._row(section) + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, column = self._row(index.row()), index.column()
+        if role == DISPLAY or role == EDIT:
+            if column == COLONNE_LIBELLE:
+                return self.ledger.libelle(row)
+            if column == COLONNE_COMPTE:
+                return self.ledger.compte(row)
+            if column == COLONNE_FEUILLE:
+                return self.ledger.sheet(row)
+            centimes = self.ledger.montant(row)
+            return format_centimes(centimes) if role == DISPLAY else format_centimes(centimes, '')
+
+        if role == ALIGNEMENT and column == COLONNE_MONTANT:
+            return ALIGNEMENT_MONTANT
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() == COLONNE_FEUILLE:
+            return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+
+        row, column = self._row(index.row()), index.column()
+        # Les modifications sont écrites directement dans les tableaux
+        if column == COLONNE_LIBELLE:
+            self.ledger.set_libelle(row, value)
+        elif column == COLONNE_COMPTE:
+            self.ledger.set_compte(row, value)
+        else:
+            self.ledger.set_montant(row, parse_centime(value))
+
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.ledger.clear()
+        self.lignes = None
+        self.endResetModel()
+
+    def set_ledger(self, ledger):
+        self.beginResetModel()
+        self.ledger = ledger
+        self.lignes = None
+        self.endResetModel()
+
+    def set_filter(self, lignes):
+        # lignes: indices croissants des lignes à afficher, None pour tout afficher
+        if lignes is None and self.lignes is None:
+            return
+        self.beginResetModel()
+        self.lignes = lignes
+        self.endResetModel()
+
+    def append_frame(self, df):
+        if not len(df):
+            return
+        if 'feuille' in df.columns and not self.ledger.feuilles:
+            # La colonne Feuille apparaît avec le premier bloc marqué
+            self.beginResetModel()
+            self.ledger.append_frame(df)
+            self.endResetModel()
+            return
+        if self.lignes is not None:
+            # Lignes masquées jusqu'au prochain filtrage
+            self.ledger.append_frame(df)
+            return
+        debut = len(self.ledger)
+        self.beginInsertRows(QModelIndex(), debut, debut + len(df) - 1)
+        self.ledger.append_frame(df)
+        self.endInsertRows()
+
+    def append_row(self):
+        # Une ligne saisie reste visible même si elle ne passe pas le filtre; renvoie sa position
+        position = self.rowCount()
+        self.beginInsertRows(QModelIndex(), position, position)
+        ligne = self.ledger.append_row()
+        if self.lignes is not None:
+            self.lignes = np.append(self.lignes, ligne)
+        self.endInsertRows()
+        return position
@@ -1,17 +1,64 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from calculator import AutofinancementCalculator
+import time
+
+# Référence pour le temps de démarrage (jusqu'au premier affichage de la fenêtre)
+DEBUT = time.perf_counter()
 
 if __name__ == "__main__":
+    # Modes ligne de commande sans interface: python main.py batch|consolidate|reports|serve|client ...
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "consolidate":
+        from consolidation import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "reports":
+        from report import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from service import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "client":
+        from service import client_main
+        sys.exit(client_main(sys.argv[2:]))
+
+    from instrumentation import instrumentation
+
+    # --profile: profil cProfile de la session (thread de l'interface et tâches de fond)
+    if "--profile" in sys.argv:
+        sys.argv.remove("--profile")
+        instrumentation.profile = True
+
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    from calculator import AutofinancementCalculator
+
     app = QApplication(sys.argv)
-    
+
     # Load stylesheet
     try:
         with open("style.css", "r") as f:
             app.setStyleSheet(f.read())
     except Exception as e:
         print(f"Could not load stylesheet: {e}")
-    
+
     calculator = AutofinancementCalculator()
     calculator.show()
-    sys.exit(app.exec())
\ No newline at end of file
+
+    def first_frame():
+        instrumentation.mark('startup', DEBUT)
+        if "--startup-time" in sys.argv:
+            print(f"{instrumentation.last['startup']['seconds']:.3f}")
+            app.quit()
+        else:
+            calculator.warm_up()
+
+    # Le délai nul s'exécute une fois la fenêtre exposée et peinte
+    QTimer.singleShot(0, first_frame)
+    with instrumentation.profiled():
+        code = app.exec()
+
+    profil = instrumentation.dump_profile()
+    if profil:
+        print(f"Profil enregistré: {profil}")
+    sys.exit(code)
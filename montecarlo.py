@@ -0,0 +1,162 @@
+"""Simulation de Monte-Carlo de la CAF et de l'autofinancement à partir des totaux par catégorie."""
+import os
+
+import numpy as np
+
+from engine import CATEGORIES, CENTIMES, SIGNES_CAF
+from pools import run_jobs
+from report import format_montant
+
+# Lois d'incertitude, exprimées en écart relatif autour du total de la catégorie:
+# normale (écart-type), uniforme (± écart) ou triangulaire symétrique (± écart, mode au total)
+LOIS = ('fixe', 'normale', 'uniforme', 'triangulaire')
+# Variance d'un écart relatif unitaire pour chaque loi
+VARIANCES = {'fixe': 0.0, 'normale': 1.0, 'uniforme': 1 / 3, 'triangulaire': 1 / 6}
+
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+# Tirages par bloc: chaque bloc a sa propre graine dérivée, le résultat ne dépend donc
+# ni du découpage entre processus ni de leur nombre
+TAILLE_BLOC = 1_000_000
+
+# En deçà, le démarrage des processus coûterait plus que les blocs eux-mêmes
+BLOCS_MIN_PROCESSUS = 8
+
+# Classes de l'histogramme de la CAF, sur moyenne ± ETENDUE écarts-types
+NB_CLASSES = 1 << 16
+ETENDUE = 8
+
+
+def caf_moments(valeurs, lois):
+    # Moyenne et écart-type exacts de la CAF simulée (catégories indépendantes), en DZD
+    moyenne = float(valeurs @ SIGNES_CAF)
+    variance = sum(
+        (valeurs[CATEGORIES.index(nom)] * ecart) ** 2 * VARIANCES[loi]
+        for nom, (loi, ecart) in lois.items()
+    )
+    return moyenne, float(np.sqrt(variance))
+
+
+def _deviations(rng, loi, ecart, n):
+    if loi == 'normale':
+        return rng.normal(0.0, ecart, n)
+    if loi == 'uniforme':
+        return rng.uniform(-ecart, ecart, n)
+    if loi == 'triangulaire':
+        return rng.triangular(-ecart, 0.0, ecart, n)
+    raise ValueError(f"Loi inconnue: {loi}")
+
+
+def _simulate_block(graine, n, valeurs, lois, dividendes, bornes):
+    rng = np.random.default_rng(graine)
+    caf = np.full(n, float(valeurs @ SIGNES_CAF))
+    pertes = 0
+    for nom, (loi, ecart) in lois.items():
+        i = CATEGORIES.index(nom)
+        if loi == 'fixe' or ecart == 0 or valeurs[i] == 0:
+            if nom == 'resultat_net':
+                pertes = n if valeurs[i] < 0 else 0
+            continue
+        tirage = _deviations(rng, loi, ecart, n)
+        tirage *= valeurs[i]
+        # Le total lui-même est déjà dans la partie fixe: seul l'écart est ajouté
+        caf += SIGNES_CAF[i] * tirage
+        if nom == 'resultat_net':
+            pertes = int(np.count_nonzero(tirage < -valeurs[i]))
+    if 'resultat_net' not in lois:
+        pertes = n if valeurs[CATEGORIES.index('resultat_net')] < 0 else 0
+
+    debut, fin = bornes
+    classes = ((caf - debut) * (NB_CLASSES / (fin - debut))).astype(np.int64)
+    np.clip(classes, 0, NB_CLASSES - 1, out=classes)
+    return {
+        'histogramme': np.bincount(classes, minlength=NB_CLASSES),
+        'pertes': pertes,
+        'caf_negative': int(np.count_nonzero(caf < 0)),
+        'autofinancement_negatif': int(np.count_nonzero(caf < dividendes)),
+        'somme': float(caf.sum()),
+        'somme_carres': float(np.square(caf).sum()),
+    }
+
+
+def _percentiles(histogramme, bornes, tirages):
+    # Interpolation linéaire dans la classe qui contient chaque rang
+    debut, fin = bornes
+    largeur = (fin - debut) / NB_CLASSES
+    cumul = np.cumsum(histogramme)
+    resultats = {}
+    for p in PERCENTILES:
+        rang = p / 100 * tirages
+        classe = int(np.searchsorted(cumul, rang))
+        classe = min(classe, NB_CLASSES - 1)
+        avant = cumul[classe - 1] if classe else 0
+        part = (rang - avant) / histogramme[classe] if histogramme[classe] else 0.5
+        resultats[p] = debut + (classe + part) * largeur
+    return resultats
+
+
+def simulate(totals, lois, dividendes=0, tirages=1_000_000, graine=0, workers=None, progress=None):
+    # totals et dividendes en centimes; lois: {catégorie: (loi, écart relatif)}.
+    # Les grands tirages sont répartis par blocs entre processus; progress(fait, total) par bloc.
+    valeurs = np.asarray(totals, dtype=np.int64) / CENTIMES
+    dividendes = int(dividendes) / CENTIMES
+    lois = {nom: (loi, float(ecart)) for nom, (loi, ecart) in lois.items() if nom in CATEGORIES[1:]}
+    for loi, ecart in lois.values():
+        if loi not in LOIS:
+            raise ValueError(f"Loi inconnue: {loi}")
+        if ecart < 0:
+            raise ValueError("L'écart d'une loi doit être positif")
+    if tirages < 1:
+        raise ValueError("Le nombre de tirages doit être positif")
+
+    moyenne, ecart_type = caf_moments(valeurs, lois)
+    demi = ETENDUE * ecart_type or max(1.0, abs(moyenne) * 1e-9)
+    bornes = (moyenne - demi, moyenne + demi)
+
+    tailles = [TAILLE_BLOC] * (tirages // TAILLE_BLOC)
+    if tirages % TAILLE_BLOC:
+        tailles.append(tirages % TAILLE_BLOC)
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    blocs = [(g, n, valeurs, lois, dividendes, bornes) for g, n in zip(graines, tailles)]
+
+    workers = min(workers or os.cpu_count() or 1, len(blocs))
+    if len(blocs) < BLOCS_MIN_PROCESSUS:
+        workers = 1
+    resultats_blocs = [None] * len(blocs)
+    for i, resultat in run_jobs(_simulate_block, enumerate(blocs), workers, progress, spawn=True):
+        # Rangés dans l'ordre des blocs: les sommes flottantes sont reproductibles
+        resultats_blocs[i] = resultat
+
+    histogramme = sum(r['histogramme'] for r in resultats_blocs)
+    somme = sum(r['somme'] for r in resultats_blocs)
+    somme_carres = sum(r['somme_carres'] for r in resultats_blocs)
+    percentiles_caf = _percentiles(histogramme, bornes, tirages)
+    return {
+        'tirages': tirages,
+        'graine': graine,
+        'dividendes': dividendes,
+        'caf_moyenne': somme / tirages,
+        'caf_ecart_type': float(np.sqrt(max(0.0, somme_carres / tirages - (somme / tirages) ** 2))),
+        'percentiles_caf': percentiles_caf,
+        'percentiles_autofinancement': {p: v - dividendes for p, v in percentiles_caf.items()},
+        'p_perte': sum(r['pertes'] for r in resultats_blocs) / tirages,
+        'p_caf_negative': sum(r['caf_negative'] for r in resultats_blocs) / tirages,
+        'p_autofinancement_negatif': sum(r['autofinancement_negatif'] for r in resultats_blocs) / tirages,
+    }
+
+
+def simulation_rows(resultats):
+    # (libellé, valeur) affichés dans l'interface et dans le rapport PDF
+    p = resultats['percentiles_autofinancement']
+    c = resultats['percentiles_caf']
+    return [
+        ("Tirages", f"{resultats['tirages']:,} (graine {resultats['graine']})".replace(",", " ")),
+        ("Probabilité de perte (résultat net < 0)", f"{resultats['p_perte']:.2%}"),
+        ("Probabilité de CAF négative", f"{resultats['p_caf_negative']:.2%}"),
+        ("Probabilité d'autofinancement négatif", f"{resultats['p_autofinancement_negatif']:.2%}"),
+        ("CAF moyenne (écart-type)",
+         f"{format_montant(round(resultats['caf_moyenne']))} ({format_montant(round(resultats['caf_ecart_type']))})"),
+        ("CAF P5 / P50 / P95", " / ".join(format_montant(round(c[q])) for q in (5, 50, 95))),
+        ("Autofinancement P1 / P5 / P50", " / ".join(format_montant(round(p[q])) for q in (1, 5, 50))),
+        ("Autofinancement P95 / P99", " / ".join(format_montant(round(p[q])) for q in (95, 99))),
+    ]
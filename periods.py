@@ -0,0 +1,126 @@
+"""Évolution de la CAF sur plusieurs périodes (mois ou années), à partir des totaux par catégorie."""
+import os
+import re
+
+import numpy as np
+
+from engine import CATEGORIES, CENTIMES, SIGNES_CAF
+from pools import run_jobs
+
+MOTIF_MOIS = re.compile(r'((?:19|20)\d{2})[-_. ]?(0[1-9]|1[0-2])(?!\d)')
+MOTIF_ANNEE = re.compile(r'(?<!\d)((?:19|20)\d{2})(?!\d)')
+
+
+def period_label(filepath):
+    # "2024-03" ou "2024" d'après le nom du fichier, sinon le nom lui-même
+    nom = os.path.splitext(os.path.basename(filepath))[0]
+    mois = MOTIF_MOIS.search(nom)
+    if mois:
+        return f"{mois.group(1)}-{mois.group(2)}"
+    annee = MOTIF_ANNEE.search(nom)
+    return annee.group(1) if annee else nom
+
+
+def _file_signature(filepath):
+    etat = os.stat(filepath)
+    return etat.st_size, etat.st_mtime_ns
+
+
+def _short_path(chemin):
+    # Dossier parent et nom: deux fichiers homonymes restent distincts ("nord/gl_2024-03.csv")
+    return os.path.join(os.path.basename(os.path.dirname(chemin)), os.path.basename(chemin))
+
+
+class PeriodSeries:
+    # Une ligne de totaux par période (matrice période × catégorie, en centimes) gardée en
+    # mémoire: ajouter un mois ne relit que son grand livre, et les indicateurs de toutes
+    # les périodes sont recalculés en une passe vectorisée sur la matrice.
+
+    def __init__(self):
+        self.periodes = []
+        self.index = {}
+        self.sources = {}
+        self.erreurs = {}
+        # Fichiers écartés parce que leur période vient déjà d'un autre fichier: {fichier: message}
+        self.doublons = {}
+        self._totaux = np.zeros((0, len(CATEGORIES)), dtype=np.int64)
+        self._dividendes = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.periodes)
+
+    def set_period(self, periode, totals, dividendes=0):
+        # Remplace la période si elle existe déjà
+        if periode not in self.index:
+            if len(self.periodes) == len(self._totaux):
+                capacite = max(16, 2 * len(self._totaux))
+                totaux = np.zeros((capacite, len(CATEGORIES)), dtype=np.int64)
+                totaux[:len(self.periodes)] = self._totaux
+                dividendes_ = np.zeros(capacite, dtype=np.int64)
+                dividendes_[:len(self.periodes)] = self._dividendes
+                self._totaux, self._dividendes = totaux, dividendes_
+            self.index[periode] = len(self.periodes)
+            self.periodes.append(periode)
+        i = self.index[periode]
+        self._totaux[i] = totals
+        self._dividendes[i] = int(dividendes)
+
+    def clear(self):
+        self.__init__()
+
+    def matrix(self):
+        # Périodes dans l'ordre chronologique ("2023-12" < "2024-01"), totaux et dividendes alignés
+        n = len(self.periodes)
+        ordre = sorted(range(n), key=self.periodes.__getitem__)
+        return [self.periodes[i] for i in ordre], self._totaux[ordre], self._dividendes[ordre]
+
+    def indicators(self):
+        # En DZD; taux d'autofinancement = autofinancement / CAF (NaN si la CAF est nulle)
+        periodes, totaux, dividendes = self.matrix()
+        caf = totaux @ SIGNES_CAF
+        autofinancement = caf - dividendes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            taux = np.where(caf != 0, autofinancement / np.where(caf != 0, caf, 1), np.nan)
+        return {
+            'periodes': periodes,
+            'resultat_net': totaux[:, CATEGORIES.index('resultat_net')] / CENTIMES,
+            'caf': caf / CENTIMES,
+            'dividendes': dividendes / CENTIMES,
+            'autofinancement': autofinancement / CENTIMES,
+            'taux': taux,
+        }
+
+    def load_files(self, fichiers, dividendes=0, workers=None, progress=None):
+        # Seuls les fichiers nouveaux ou modifiés depuis leur dernière lecture sont lus.
+        # Une période n'a qu'un fichier: un autre fichier de même période (autre entité, nom
+        # sans date) est écarté et signalé dans self.doublons, jamais substitué en silence.
+        # Renvoie le nombre de périodes ajoutées ou mises à jour.
+        a_lire = []
+        chemins = {periode: source[0] for periode, source in self.sources.items()}
+        for fichier in fichiers:
+            periode = period_label(fichier)
+            chemin = os.path.abspath(fichier)
+            if chemins.setdefault(periode, chemin) != chemin:
+                self.doublons[chemin] = (
+                    f"{_short_path(chemin)}: période {periode} déjà lue depuis {_short_path(chemins[periode])}"
+                )
+                continue
+            self.doublons.pop(chemin, None)
+            source = (chemin, _file_signature(fichier))
+            if self.sources.get(periode) != source:
+                a_lire.append((periode, fichier, source))
+
+        from batch import load_totals
+
+        jobs = [((periode, source), (fichier,)) for periode, fichier, source in a_lire]
+        # Annulation (progress lève): les fichiers pas encore commencés ne sont pas lus
+        for (periode, source), (_, totals, erreur) in run_jobs(
+            load_totals, jobs, workers, progress, echec=lambda cle, erreur: (None, None, erreur), spawn=True
+        ):
+            if erreur:
+                self.erreurs[periode] = erreur
+                continue
+            self.erreurs.pop(periode, None)
+            self.set_period(periode, totals, dividendes)
+            self.sources[periode] = source
+        return len(a_lire) - sum(periode in self.erreurs for periode, _, _ in a_lire)
@@ -0,0 +1,49 @@
+"""Pools de processus partagés par les traitements en lot."""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def shutdown_pool(executor, futures):
+    # shutdown(cancel_futures=True) n'existe qu'à partir de Python 3.9:
+    # les tâches pas encore commencées sont annulées une à une
+    for future in futures:
+        future.cancel()
+    executor.shutdown()
+
+
+def run_jobs(fonction, jobs, workers=None, progress=None, echec=None, spawn=False, **options):
+    # jobs: [(clé, arguments)]; renvoie (clé, fonction(*arguments)) au fil des fins de tâche.
+    # Un processus de travail tombé (mémoire, crash natif...) donne echec(clé, message) pour
+    # sa tâche, ou lève si echec est None. Si l'appelant s'interrompt (progress lève), les
+    # tâches pas encore commencées sont annulées.
+    # spawn: l'appel peut venir d'un thread de l'interface Qt, qu'un fork dupliquerait mal.
+    # options: passées à ProcessPoolExecutor (initializer, initargs).
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for i, (cle, arguments) in enumerate(jobs):
+            yield cle, fonction(*arguments)
+            if progress:
+                progress(i + 1, len(jobs))
+        return
+
+    if spawn:
+        options['mp_context'] = multiprocessing.get_context('spawn')
+    executor = ProcessPoolExecutor(max_workers=workers, **options)
+    futures = {}
+    try:
+        for cle, arguments in jobs:
+            futures[executor.submit(fonction, *arguments)] = cle
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                resultat = future.result()
+            except Exception as e:
+                if echec is None:
+                    raise
+                resultat = echec(futures[future], f"{type(e).__name__}: {e}")
+            yield futures[future], resultat
+            if progress:
+                progress(i + 1, len(jobs))
+    finally:
+        shutdown_pool(executor, futures)
@@ -0,0 +1,259 @@
+"""Rapports PDF d'autofinancement, générés sans widgets (unitairement ou en lot)."""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from html import escape
+
+from interpretation import get_interpretation
+from pools import run_jobs
+
+# Nom sous lequel l'image du graphique est enregistrée dans chaque QTextDocument
+CHART_RESOURCE = "caf-chart.png"
+
+_application = None
+
+
+def format_montant(value):
+    return f"{value:,.0f} DZD".replace(",", " ") if value == int(value) else f"{value:,.2f} DZD".replace(",", " ")
+
+
+def report_texts(resultats):
+    return {
+        'resultat_net': format_montant(resultats['resultat_net']),
+        'caf': format_montant(resultats['caf']),
+        'autofinancement': format_montant(resultats['autofinancement']),
+        'interpretation': get_interpretation(
+            resultats['resultat_net'], resultats['caf'],
+            resultats['autofinancement'], resultats.get('dividendes', 0.0)
+        ),
+    }
+
+
+def generate_report_html(textes, chart_path, entite=None):
+    interpretation = textes['interpretation'].replace('\n\n', '<br><br>')
+    ligne_entite = f"<p>Entité: {escape(str(entite))}</p>" if entite else ""
+    simulation = ""
+    if textes.get('simulation'):
+        lignes = "".join(
+            f"<tr><td>{escape(libelle)}</td><td class=\"value\">{escape(valeur)}</td></tr>"
+            for libelle, valeur in textes['simulation']
+        )
+        simulation = f"""
+    <div class="simulation">
+        <h2>Simulation de Monte-Carlo</h2>
+        <table cellpadding="4">{lignes}</table>
+    </div>
+    """
+    return f"""
+    <html>
+    <head>
+    <style>
+    body {{ font-family: Arial; margin: 20px; }}
+    h1 {{ color: #333; border-bottom: 1px solid #eee; padding-bottom: 10px; }}
+    .header {{ background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
+    .result {{ margin: 15px 0; }}
+    .value {{ font-weight: bold; color: #2196F3; }}
+    .interpretation {{ background-color: #f9f9f9; padding: 15px; border-left: 4px solid #2196F3; border-radius: 4px; }}
+    .chart-container {{ text-align: center; margin: 20px 0; }}
+    </style>
+    </head>
+    <body>
+    <div class="header">
+        <h1>Rapport d'Autofinancement</h1>
+        {ligne_entite}
+        <p>Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}</p>
+    </div>
+
+    <div class="results">
+        <h2>Résultats Clés</h2>
+        <div class="result">
+            <span>Résultat net de l'exercice: </span>
+            <span class="value">{textes['resultat_net']}</span>
+        </div>
+        <div class="result">
+            <span>Capacité d'Autofinancement (CAF): </span>
+            <span class="value">{textes['caf']}</span>
+        </div>
+        <div class="result">
+            <span>Autofinancement: </span>
+            <span class="value">{textes['autofinancement']}</span>
+        </div>
+    </div>
+
+    <div class="chart-container">
+        <h2>Visualisation</h2>
+        <img src="{chart_path}" width="500" />
+    </div>
+
+    <div class="interpretation">
+        <h2>Interprétation</h2>
+        <p>{interpretation}</p>
+    </div>
+    {simulation}
+    </body>
+    </html>
+    """
+
+
+def ensure_gui_application():
+    # QTextDocument et QPrinter ont besoin d'une QGuiApplication, pas d'une fenêtre
+    global _application
+    from PySide6.QtGui import QGuiApplication
+
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _application = QGuiApplication([])
+    return QGuiApplication.instance()
+
+
+def print_html(filepath, html, chart_png):
+    from PySide6.QtCore import QUrl
+    from PySide6.QtGui import QImage, QTextDocument
+    from PySide6.QtPrintSupport import QPrinter
+
+    # L'image est une ressource propre à ce document, jamais un fichier temporaire partagé
+    doc = QTextDocument()
+    doc.addResource(QTextDocument.ImageResource, QUrl(CHART_RESOURCE), QImage.fromData(chart_png, "PNG"))
+    doc.setHtml(html)
+
+    printer = QPrinter(QPrinter.HighResolution)
+    printer.setOutputFormat(QPrinter.PdfFormat)
+    printer.setOutputFileName(filepath)
+    doc.print_(printer)
+    return filepath
+
+
+def render_report(filepath, resultats, entite=None):
+    from chart import render_chart_png
+
+    ensure_gui_application()
+    chart_png = render_chart_png(resultats['resultat_net'], resultats['caf'], resultats['autofinancement'])
+    html = generate_report_html(report_texts(resultats), CHART_RESOURCE, entite)
+    return print_html(filepath, html, chart_png)
+
+
+def report_filename(entite):
+    return re.sub(r'[^\w.-]+', '_', str(entite)).strip('_') + '.pdf'
+
+
+def report_filenames(entites):
+    # Un PDF par entité: deux entités qui donneraient le même nom de fichier (à la casse près,
+    # pour les systèmes de fichiers qui l'ignorent) sont départagées par un suffixe -2, -3...
+    noms, pris = [], set()
+    for entite in entites:
+        base = report_filename(entite)[:-len('.pdf')]
+        nom, i = base, 1
+        while nom.lower() in pris:
+            i += 1
+            nom = f"{base}-{i}"
+        pris.add(nom.lower())
+        noms.append(nom + '.pdf')
+    return noms
+
+
+def _render_job(entite, resultats, output_dir, filename):
+    # Ne lève jamais: l'erreur est renvoyée avec l'entité concernée
+    filepath = os.path.join(output_dir, filename)
+    try:
+        render_report(filepath, resultats, entite)
+        return entite, filepath, ''
+    except Exception as e:
+        return entite, filepath, f"{type(e).__name__}: {e}"
+
+
+def render_reports(jobs, output_dir, workers=None, progress=None):
+    # jobs: liste de (entite, resultats); un processus = une QGuiApplication hors écran.
+    # Un processus tombé (mémoire, crash natif...) n'échoue que pour son entité.
+    os.makedirs(output_dir, exist_ok=True)
+    noms = report_filenames(entite for entite, _ in jobs)
+    taches = [
+        ((entite, os.path.join(output_dir, nom)), (entite, resultats, output_dir, nom))
+        for (entite, resultats), nom in zip(jobs, noms)
+    ]
+    return [
+        sortie for _, sortie in run_jobs(
+            _render_job, taches, workers, progress,
+            echec=lambda cle, erreur: (*cle, erreur), initializer=ensure_gui_application,
+        )
+    ]
+
+
+def _homonyms(noms):
+    compte = Counter(nom.lower() for nom in noms)
+    return [i for i, nom in enumerate(noms) if compte[nom.lower()] > 1]
+
+
+def entity_names(fichiers):
+    # Nom du fichier sans extension; pour des homonymes, avec l'extension (acme.csv, acme.xlsx),
+    # puis en chemin depuis leur dossier commun (nord/balance.xlsx, sud/balance.xlsx)
+    chemins = [os.path.abspath(str(fichier)) for fichier in fichiers]
+    noms = [os.path.splitext(os.path.basename(chemin))[0] for chemin in chemins]
+    for i in _homonyms(noms):
+        noms[i] = os.path.basename(chemins[i])
+    homonymes = _homonyms(noms)
+    if homonymes:
+        try:
+            commun = os.path.commonpath([os.path.dirname(chemins[i]) for i in homonymes])
+        except ValueError:
+            # Lecteurs différents (Windows): le chemin complet départage
+            commun = ''
+        for i in homonymes:
+            noms[i] = os.path.relpath(chemins[i], commun).replace(os.sep, '/') if commun else chemins[i]
+    return noms
+
+
+def jobs_from_summary(resume):
+    # Lignes d'une synthèse produite par batch.py (les fichiers en erreur sont ignorés)
+    jobs = []
+    lignes = [ligne for ligne in resume.to_dict('records') if not ligne.get('erreur')]
+    noms = entity_names(ligne.get('fichier', '') for ligne in lignes)
+    for ligne, nom in zip(lignes, noms):
+        entite = ligne.get('entite') or nom
+        resultats = {
+            cle: float(ligne.get(cle) or 0.0)
+            for cle in ('resultat_net', 'caf', 'autofinancement', 'dividendes')
+        }
+        jobs.append((entite, resultats))
+    return jobs
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Génération de rapports PDF d'autofinancement en lot")
+    parser.add_argument('resume', help="Synthèse CSV ou Parquet produite par 'python main.py batch'")
+    parser.add_argument('-o', '--output', default='rapports', help="Dossier de sortie des PDF")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus (défaut: tous les cœurs)")
+    args = parser.parse_args(argv)
+
+    if args.resume.lower().endswith('.parquet'):
+        resume = pd.read_parquet(args.resume)
+    else:
+        resume = pd.read_csv(args.resume, keep_default_na=False)
+    jobs = jobs_from_summary(resume)
+    if not jobs:
+        print("Aucune entité à traiter", file=sys.stderr)
+        return 1
+
+    def progress(fait, total):
+        print(f"\r{fait}/{total} rapports générés", end='', file=sys.stderr)
+
+    debut = time.perf_counter()
+    sorties = render_reports(jobs, args.output, args.workers, progress)
+    erreurs = [(entite, erreur) for entite, _, erreur in sorties if erreur]
+    print(
+        f"\n{len(sorties)} rapports en {time.perf_counter() - debut:.1f} s "
+        f"({len(erreurs)} en erreur) -> {args.output}",
+        file=sys.stderr
+    )
+    for entite, erreur in erreurs:
+        print(f"{entite}: {erreur}", file=sys.stderr)
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Grille de scénarios « et si » sur les dividendes et les composantes de la CAF."""
+import math
+
+import numpy as np
+
+from engine import CATEGORIES, SIGNES_CAF
+
+# Composantes de la CAF que l'on peut faire varier, en plus des dividendes
+COMPOSANTES = ['dotations', 'valeur_cession', 'reprises', 'produits_cession', 'subventions']
+AXE_DIVIDENDES = 'dividendes'
+LIBELLES = {
+    AXE_DIVIDENDES: 'Dividendes',
+    'dotations': 'Dotations',
+    'valeur_cession': 'Valeur de cession',
+    'reprises': 'Reprises',
+    'produits_cession': 'Produits de cession',
+    'subventions': 'Subventions',
+}
+
+# Au-delà, la grille (8 octets par scénario) n'est plus interactive
+MAX_SCENARIOS = 2_000_000
+
+
+def axis_values(centre, amplitude, points):
+    # centre ± amplitude × |centre|, en centimes
+    if points == 1:
+        return np.array([centre], dtype=np.int64)
+    ecart = abs(int(centre)) * amplitude
+    return np.rint(np.linspace(centre - ecart, centre + ecart, points)).astype(np.int64)
+
+
+def dividend_values(totals, dividendes, amplitude, points):
+    # De 0 à amplitude × la plus grande de la CAF et des dividendes saisis, en centimes
+    caf = int(np.asarray(totals, dtype=np.int64) @ SIGNES_CAF)
+    plafond = max(abs(caf), int(dividendes)) * amplitude
+    return np.rint(np.linspace(0, plafond, points)).astype(np.int64)
+
+
+def scenario_grid(totals, axes, dividendes=0):
+    # axes: [(nom, valeurs en centimes)], nom dans COMPOSANTES ou AXE_DIVIDENDES.
+    # Renvoie l'autofinancement (centimes, int64) de chaque combinaison: grille[i0, i1, ...].
+    # La CAF étant linéaire dans ses composantes, chaque axe est ajouté en diffusion
+    # (broadcasting) à la grille, sans boucle Python sur les scénarios.
+    totals = np.asarray(totals, dtype=np.int64)
+    forme = tuple(len(valeurs) for _, valeurs in axes)
+    if math.prod(forme) > MAX_SCENARIOS:
+        raise ValueError(f"Trop de scénarios ({math.prod(forme):,} > {MAX_SCENARIOS:,})".replace(",", " "))
+
+    # Partie fixe: CAF et dividendes actuels, moins ce que les axes remplacent
+    fixe = int(totals @ SIGNES_CAF) - int(dividendes)
+    contributions = []
+    for nom, valeurs in axes:
+        valeurs = np.asarray(valeurs, dtype=np.int64)
+        if nom == AXE_DIVIDENDES:
+            fixe += int(dividendes)
+            contributions.append(-valeurs)
+        else:
+            signe = SIGNES_CAF[CATEGORIES.index(nom)]
+            fixe -= int(signe * totals[CATEGORIES.index(nom)])
+            contributions.append(signe * valeurs)
+
+    grille = np.full(forme, fixe, dtype=np.int64)
+    for axe, contribution in enumerate(contributions):
+        diffusion = [1] * len(forme)
+        diffusion[axe] = len(contribution)
+        grille += contribution.reshape(diffusion)
+    return grille
+
+
+def worst_case(grille, axe_x, axe_y):
+    # Autofinancement le plus bas sur les autres axes, rangé [y, x] pour une carte de chaleur
+    autres = tuple(axe for axe in range(grille.ndim) if axe not in (axe_x, axe_y))
+    pire = grille.min(axis=autres) if autres else grille
+    return pire.T if axe_x < axe_y else pire
+
+
+def grid_summary(grille):
+    return {
+        'scenarios': int(grille.size),
+        'negatifs': float(np.count_nonzero(grille < 0) / grille.size) if grille.size else 0.0,
+        'min': int(grille.min()) if grille.size else 0,
+        'max': int(grille.max()) if grille.size else 0,
+    }
@@ -0,0 +1,407 @@
+"""Service local JSON/HTTP de calcul de la CAF (asyncio, bibliothèque standard uniquement)."""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from batch import process_file
+from engine import (
+    compute_from_totals, get_classifier, normalize_comptes, parse_centime, parse_centimes, sum_by_category
+)
+from interpretation import get_interpretation
+from ledger_io import detect_columns, require_columns
+
+# Taille des blocs lus sur la socket et écrits dans le fichier temporaire
+TAILLE_BLOC = 64 * 1024
+
+# Au-delà, le client reçoit 413
+TAILLE_MAX_MO = 512
+
+# Extension du fichier temporaire selon le type du contenu envoyé
+EXTENSIONS = {
+    'text/csv': '.csv',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+    'application/vnd.ms-excel': '.xls',
+}
+
+STATUTS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+    422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class ErreurHttp(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+# Calculs exécutés dans les processus de travail
+
+def _warm_worker():
+    # Les bibliothèques lourdes sont chargées une fois par processus, pas à la première requête
+    import pandas  # noqa: F401
+
+
+def _noop():
+    return None
+
+
+def _with_interpretation(resultats):
+    resultats['interpretation'] = get_interpretation(
+        resultats['resultat_net'], resultats['caf'], resultats['autofinancement'], resultats['dividendes']
+    )
+    return resultats
+
+
+def compute_rows(rows, dividendes=0):
+    # rows: liste d'objets {"Compte": ..., "Montant": ...} (noms détectés comme à l'import).
+    # Les petites requêtes sont les plus fréquentes: colonnes construites sans DataFrame.
+    debut = time.perf_counter()
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Chaque ligne doit être un objet JSON")
+    noms = {str(nom).strip().lower(): nom for nom in (rows[0] if rows else {})}
+    compte_col, montant_col, _ = detect_columns(noms)
+    require_columns(compte_col, montant_col)
+
+    comptes = normalize_comptes([row.get(noms[compte_col]) for row in rows])
+    valides = comptes != ''
+    centimes = parse_centimes([row.get(noms[montant_col]) for row in rows])[valides]
+    totals = sum_by_category(get_classifier().classify(comptes[valides]), centimes)
+    resultats = {'lignes': len(rows), 'lignes_valides': int(valides.sum())}
+    resultats.update(compute_from_totals(totals, dividendes))
+    resultats['duree'] = time.perf_counter() - debut
+    return _with_interpretation(resultats)
+
+
+def compute_file(filepath, dividendes=0):
+    resultats = process_file(filepath, dividendes)
+    if resultats['erreur']:
+        raise ValueError(resultats['erreur'])
+    del resultats['fichier'], resultats['erreur']
+    return _with_interpretation(resultats)
+
+
+class CafService:
+    # Les requêtes passent par une file bornée: au-delà de `file_max` calculs en attente,
+    # le service répond 503 au lieu d'accumuler du travail qu'il ne pourra pas rendre à temps.
+
+    def __init__(self, workers=None, file_max=None, taille_max_mo=TAILLE_MAX_MO):
+        self.workers = workers or os.cpu_count() or 1
+        self.file_max = file_max or self.workers * 16
+        self.taille_max = taille_max_mo * 1024 * 1024
+        self.executor = None
+        self.file = None
+        self.consommateurs = []
+        self.servies = 0
+
+    async def start(self, host='127.0.0.1', port=8765):
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Processus démarrés avant d'accepter des connexions
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _noop) for _ in range(self.workers)))
+        self.file = asyncio.Queue(maxsize=self.file_max)
+        # Un consommateur par processus: jamais plus de calculs en cours que de cœurs
+        self.consommateurs = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        return await asyncio.start_server(self.handle, host, port, limit=TAILLE_BLOC, backlog=1024)
+
+    async def stop(self):
+        for consommateur in self.consommateurs:
+            consommateur.cancel()
+        # L'annulation d'un consommateur annule aussi le calcul qu'il attendait
+        # (shutdown(cancel_futures=True) demanderait Python 3.9)
+        await asyncio.gather(*self.consommateurs, return_exceptions=True)
+        self.executor.shutdown()
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, future = await self.file.get()
+            try:
+                if not future.cancelled():
+                    future.set_result(await loop.run_in_executor(self.executor, fn, *args))
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self.file.task_done()
+
+    async def submit(self, fn, *args):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.file.put_nowait((fn, args, future))
+        except asyncio.QueueFull:
+            raise ErreurHttp(503, "Service saturé, réessayer plus tard")
+        try:
+            return await future
+        except ValueError as e:
+            raise ErreurHttp(422, str(e))
+
+    # HTTP/1.1 minimal, connexions persistantes
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, cible, version = ligne.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'erreur': "Requête mal formée"}, False)
+                    break
+                entetes = await self._read_headers(reader)
+                garder = version == 'HTTP/1.1' and entetes.get('connection', '').lower() != 'close'
+                try:
+                    statut, corps = await self.route(methode, cible, entetes, reader)
+                except ErreurHttp as e:
+                    statut, corps = e.statut, {'erreur': str(e)}
+                    # Un corps laissé non lu sur la socket rendrait la connexion inutilisable
+                    sans_corps = entetes.get('content-length', '0') == '0' and 'transfer-encoding' not in entetes
+                    garder = garder and (sans_corps or entetes.get('_lu', False))
+                except Exception as e:
+                    statut, corps, garder = 500, {'erreur': f"{type(e).__name__}: {e}"}, False
+                self.servies += 1
+                await self._respond(writer, statut, corps, garder)
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Client parti, ou ligne d'en-tête au-delà de TAILLE_BLOC
+            pass
+        finally:
+            writer.close()
+
+    async def _read_headers(self, reader):
+        entetes = {}
+        while True:
+            ligne = await reader.readline()
+            if ligne in (b'\r\n', b'\n', b''):
+                return entetes
+            nom, _, valeur = ligne.decode('latin-1').partition(':')
+            entetes[nom.strip().lower()] = valeur.strip()
+
+    async def _respond(self, writer, statut, corps, garder):
+        donnees = json.dumps(corps, ensure_ascii=False).encode('utf-8')
+        entetes = [
+            f"HTTP/1.1 {statut} {STATUTS.get(statut, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(donnees)}",
+            f"Connection: {'keep-alive' if garder else 'close'}",
+        ]
+        if statut == 503:
+            entetes.append("Retry-After: 1")
+        writer.write(('\r\n'.join(entetes) + '\r\n\r\n').encode('latin-1') + donnees)
+        await writer.drain()
+
+    async def _iter_body(self, reader, entetes):
+        # Corps lu bloc par bloc (Content-Length ou Transfer-Encoding: chunked)
+        recu = 0
+        if entetes.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                taille = int((await reader.readline()).split(b';')[0], 16)
+                if taille == 0:
+                    await self._read_headers(reader)
+                    break
+                recu += taille
+                if recu > self.taille_max:
+                    raise ErreurHttp(413, "Fichier trop volumineux")
+                yield await reader.readexactly(taille)
+                await reader.readline()
+        elif 'content-length' in entetes:
+            reste = int(entetes['content-length'])
+            if reste > self.taille_max:
+                raise ErreurHttp(413, "Fichier trop volumineux")
+            while reste:
+                bloc = await reader.read(min(reste, TAILLE_BLOC))
+                if not bloc:
+                    raise asyncio.IncompleteReadError(b'', reste)
+                reste -= len(bloc)
+                yield bloc
+        else:
+            raise ErreurHttp(411, "Content-Length ou Transfer-Encoding: chunked requis")
+        entetes['_lu'] = True
+
+    async def route(self, methode, cible, entetes, reader):
+        url = urlsplit(cible)
+        if url.path == '/health':
+            return 200, {'statut': 'ok', 'en_attente': self.file.qsize(), 'servies': self.servies}
+        if url.path != '/caf':
+            raise ErreurHttp(404, f"Chemin inconnu: {url.path}")
+        if methode != 'POST':
+            raise ErreurHttp(405, "POST attendu")
+
+        parametres = parse_qs(url.query)
+        dividendes = parse_centime(parametres.get('dividendes', ['0'])[0])
+        type_contenu = entetes.get('content-type', '').split(';')[0].strip().lower()
+
+        if type_contenu == 'application/json':
+            corps = b''.join([bloc async for bloc in self._iter_body(reader, entetes)])
+            try:
+                document = json.loads(corps)
+            except ValueError as e:
+                raise ErreurHttp(400, f"JSON invalide: {e}")
+            if isinstance(document, dict):
+                if 'dividendes' in document:
+                    dividendes = parse_centime(document['dividendes'])
+                document = document.get('rows')
+            if not isinstance(document, list):
+                raise ErreurHttp(400, "Attendu: {\"rows\": [...], \"dividendes\": ...}")
+            return 200, await self.submit(compute_rows, document, dividendes)
+
+        format_fichier = parametres.get('format', [None])[0]
+        extension = f".{format_fichier}" if format_fichier else EXTENSIONS.get(type_contenu)
+        if extension not in ('.csv', '.xlsx', '.xls'):
+            raise ErreurHttp(415, "Types acceptés: application/json, text/csv, xlsx, xls (ou ?format=)")
+
+        # Le fichier est écrit sur disque au fil de la réception, jamais gardé en mémoire
+        descripteur, chemin = tempfile.mkstemp(suffix=extension, prefix='caf-')
+        try:
+            with os.fdopen(descripteur, 'wb') as f:
+                async for bloc in self._iter_body(reader, entetes):
+                    f.write(bloc)
+            return 200, await self.submit(compute_file, chemin, dividendes)
+        finally:
+            os.remove(chemin)
+
+
+async def serve(host, port, workers=None, file_max=None, taille_max_mo=TAILLE_MAX_MO):
+    service = CafService(workers, file_max, taille_max_mo)
+    serveur = await service.start(host, port)
+    print(f"Service CAF sur http://{host}:{port} ({service.workers} processus)", file=sys.stderr)
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service local JSON/HTTP de calcul de la CAF")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus (défaut: tous les cœurs)")
+    parser.add_argument('--file-max', type=int, default=None, help="Calculs en attente avant de répondre 503")
+    parser.add_argument('--taille-max', type=int, default=TAILLE_MAX_MO, help="Taille maximale d'un envoi (Mo)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.file_max, args.taille_max))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# Client
+
+class CafClient:
+    # Une connexion persistante par client (un client par thread)
+
+    def __init__(self, host='127.0.0.1', port=8765, timeout=60):
+        self.connexion = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, chemin, corps, entetes):
+        self.connexion.request('POST', chemin, body=corps, headers=entetes)
+        reponse = self.connexion.getresponse()
+        document = json.loads(reponse.read())
+        if reponse.status != 200:
+            raise RuntimeError(f"{reponse.status}: {document.get('erreur')}")
+        return document
+
+    def compute_rows(self, rows, dividendes=None):
+        document = {'rows': rows}
+        if dividendes is not None:
+            document['dividendes'] = dividendes
+        corps = json.dumps(document).encode('utf-8')
+        return self._request('/caf', corps, {'Content-Type': 'application/json'})
+
+    def compute_file(self, filepath, dividendes=0):
+        parametres = urlencode({
+            'format': os.path.splitext(filepath)[1].lower().lstrip('.'),
+            'dividendes': dividendes,
+        })
+        # http.client envoie le fichier par blocs avec son Content-Length
+        with open(filepath, 'rb') as f:
+            return self._request(
+                f"/caf?{parametres}", f,
+                {'Content-Type': 'application/octet-stream', 'Content-Length': str(os.path.getsize(filepath))}
+            )
+
+    def close(self):
+        self.connexion.close()
+
+
+def client_main(argv=None):
+    parser = argparse.ArgumentParser(description="Client du service CAF local")
+    parser.add_argument('fichier', help="Grand livre .xlsx/.xls/.csv, ou .json ({\"rows\": [...]})")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--dividendes', default=None, help="Dividendes (compte 457), ex. \"1 000,50\"")
+    parser.add_argument('--repeat', type=int, default=1, help="Nombre de requêtes (mesure de débit)")
+    parser.add_argument('--concurrency', type=int, default=1, help="Connexions simultanées")
+    args = parser.parse_args(argv)
+
+    if args.fichier.lower().endswith('.json'):
+        with open(args.fichier, encoding='utf-8') as f:
+            document = json.load(f)
+        rows = document['rows'] if isinstance(document, dict) else document
+        dividendes = document.get('dividendes') if isinstance(document, dict) else None
+        if args.dividendes is not None:
+            dividendes = args.dividendes
+
+        def envoyer(client):
+            return client.compute_rows(rows, dividendes)
+    else:
+        def envoyer(client):
+            return client.compute_file(args.fichier, args.dividendes or 0)
+
+    resultats, erreurs = [], []
+    restantes = iter(range(args.repeat))
+    verrou = threading.Lock()
+
+    def travailler():
+        client = CafClient(args.host, args.port)
+        try:
+            while True:
+                with verrou:
+                    if next(restantes, None) is None:
+                        return
+                try:
+                    resultats.append(envoyer(client))
+                except Exception as e:
+                    erreurs.append(str(e))
+                    client.close()
+                    client = CafClient(args.host, args.port)
+        finally:
+            client.close()
+
+    debut = time.perf_counter()
+    threads = [threading.Thread(target=travailler) for _ in range(max(1, args.concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    if args.repeat == 1 and resultats:
+        print(json.dumps(resultats[0], ensure_ascii=False, indent=2))
+    else:
+        print(
+            f"{len(resultats)} réponses en {duree:.2f} s ({len(resultats) / duree:.0f} req/s, "
+            f"{len(erreurs)} en erreur)",
+            file=sys.stderr
+        )
+    for erreur in sorted(set(erreurs)):
+        print(erreur, file=sys.stderr)
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Fichier de session (.caf): colonnes du grand livre à plat, rouvertes par np.memmap."""
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from engine import CATEGORIES
+from ledger import Ledger
+
+MAGIC = b'CAFSESS\x00'
+VERSION = 1
+PAGE = 4096
+EXTENSION = '.caf'
+SEPARATEUR = '\x00'
+
+# Marge laissée derrière la dernière ligne: les lignes ajoutées s'enregistrent sans tout réécrire
+MARGE_MIN = 1024
+
+# magic, version, lignes, capacité, dividendes (centimes), totaux par catégorie (centimes),
+# position des vocabulaires, octets et nombre de valeurs des comptes puis des libellés
+ENTETE = struct.Struct(f'<8sI4xqqq{len(CATEGORIES)}qqqqqq')
+
+# Une colonne par page alignée, sur `capacité` lignes
+COLONNES = (
+    ('compte_codes', np.int32),
+    ('libelle_codes', np.int32),
+    ('centimes', np.int64),
+)
+
+
+def _align(position):
+    return -(-position // PAGE) * PAGE
+
+
+def _layout(capacite):
+    positions = {}
+    position = PAGE
+    for nom, dtype in COLONNES:
+        positions[nom] = position
+        position = _align(position + capacite * np.dtype(dtype).itemsize)
+    # Les vocabulaires suivent les colonnes
+    return positions, position
+
+
+def _pack(valeurs):
+    return SEPARATEUR.join(valeurs).encode('utf-8')
+
+
+def _unpack(donnees):
+    return donnees.decode('utf-8').split(SEPARATEUR)
+
+
+def _write_vocabularies(f, position, ledger):
+    comptes, libelles = _pack(ledger.comptes.valeurs), _pack(ledger.libelles.valeurs)
+    f.seek(position)
+    f.write(comptes)
+    f.write(libelles)
+    f.truncate()
+    return len(comptes), len(libelles)
+
+
+def _write_header(f, ledger, capacite, dividendes, position_vocabulaires, tailles):
+    f.seek(0)
+    f.write(ENTETE.pack(
+        MAGIC, VERSION, len(ledger), capacite, int(dividendes), *ledger.category_totals(),
+        position_vocabulaires, tailles[0], tailles[1], len(ledger.comptes), len(ledger.libelles),
+    ))
+
+
+def _map_columns(chemin, capacite):
+    # Copie à l'écriture: les modifications restent en mémoire jusqu'au prochain enregistrement
+    positions, _ = _layout(capacite)
+    return {
+        nom: np.memmap(chemin, dtype=dtype, mode='c', offset=positions[nom], shape=(capacite,))
+        for nom, dtype in COLONNES
+    }
+
+
+def _save_full(chemin, ledger, dividendes):
+    capacite = len(ledger) + max(MARGE_MIN, len(ledger) // 4)
+    positions, position_vocabulaires = _layout(capacite)
+
+    # Écriture dans un fichier voisin puis remplacement: une session n'est jamais à moitié écrite
+    descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(chemin)), suffix='.tmp')
+    try:
+        with os.fdopen(descripteur, 'w+b') as f:
+            for nom, dtype in COLONNES:
+                f.seek(positions[nom])
+                f.write(np.ascontiguousarray(getattr(ledger, nom), dtype=dtype).tobytes())
+            tailles = _write_vocabularies(f, position_vocabulaires, ledger)
+            _write_header(f, ledger, capacite, dividendes, position_vocabulaires, tailles)
+        # Windows refuse de remplacer un fichier encore projeté en mémoire (session ouverte):
+        # les colonnes sont d'abord recopiées en mémoire
+        if any(isinstance(getattr(ledger, nom), np.memmap) for nom, _ in COLONNES):
+            ledger.reattach(**{nom: np.array(getattr(ledger, nom)) for nom, _ in COLONNES})
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.remove(temporaire)
+        raise
+    # Le grand livre repose ensuite sur le fichier écrit, comme une session rouverte
+    ledger.reattach(**_map_columns(chemin, capacite))
+    return capacite, tailles
+
+
+def _save_incremental(chemin, ledger, dividendes, etat):
+    capacite = etat['capacite']
+    positions, position_vocabulaires = _layout(capacite)
+    deja = etat['lignes']
+    # Lignes déjà enregistrées puis modifiées, et lignes ajoutées depuis
+    modifiees = np.fromiter((ligne for ligne in ledger.modifiees if ligne < deja), dtype=np.int64)
+
+    with open(chemin, 'r+b') as f:
+        if len(modifiees) or len(ledger) > deja:
+            for nom, dtype in COLONNES:
+                source = getattr(ledger, nom)
+                cible = np.memmap(f, dtype=dtype, mode='r+', offset=positions[nom], shape=(capacite,))
+                cible[modifiees] = source[modifiees]
+                cible[deja:len(ledger)] = source[deja:]
+                cible.flush()
+                del cible
+
+        tailles = etat['tailles']
+        if (len(ledger.comptes), len(ledger.libelles)) != (etat['comptes'], etat['libelles']):
+            tailles = _write_vocabularies(f, position_vocabulaires, ledger)
+        # L'en-tête est écrit en dernier: il ne désigne que des données déjà en place
+        _write_header(f, ledger, capacite, dividendes, position_vocabulaires, tailles)
+    return tailles
+
+
+def save_session(chemin, ledger, dividendes=0):
+    # Renvoie 'incrémental' si seules les parties modifiées ont été réécrites, sinon 'complet'
+    chemin = os.path.abspath(chemin)
+    etat = ledger.enregistrement
+    incremental = (
+        etat is not None and etat['chemin'] == chemin and os.path.exists(chemin)
+        and etat['lignes'] <= len(ledger) <= etat['capacite']
+    )
+    if incremental:
+        capacite, tailles = etat['capacite'], _save_incremental(chemin, ledger, dividendes, etat)
+    else:
+        capacite, tailles = _save_full(chemin, ledger, dividendes)
+
+    ledger.modifiees.clear()
+    ledger.enregistrement = {
+        'chemin': chemin, 'lignes': len(ledger), 'capacite': capacite, 'tailles': tailles,
+        'comptes': len(ledger.comptes), 'libelles': len(ledger.libelles),
+    }
+    return 'incrémental' if incremental else 'complet'
+
+
+def load_session(chemin):
+    # Les colonnes sont projetées en mémoire (copie à l'écriture): seules les pages
+    # consultées sont lues, et les totaux viennent de l'en-tête sans parcourir les lignes.
+    chemin = os.path.abspath(chemin)
+    with open(chemin, 'rb') as f:
+        entete = f.read(ENTETE.size)
+        if len(entete) < ENTETE.size or entete[:len(MAGIC)] != MAGIC:
+            raise ValueError("Ce fichier n'est pas une session du calculateur")
+        valeurs = ENTETE.unpack(entete)
+        version, lignes, capacite, dividendes = valeurs[1:5]
+        if version != VERSION:
+            raise ValueError(f"Version de session non prise en charge: {version}")
+        totals = valeurs[5:5 + len(CATEGORIES)]
+        position_vocabulaires, octets_comptes, octets_libelles, nb_comptes, nb_libelles = valeurs[5 + len(CATEGORIES):]
+
+        f.seek(position_vocabulaires)
+        comptes = _unpack(f.read(octets_comptes))
+        libelles = _unpack(f.read(octets_libelles))
+    if (len(comptes), len(libelles)) != (nb_comptes, nb_libelles):
+        raise ValueError("Session corrompue: vocabulaires incomplets")
+
+    colonnes = _map_columns(chemin, capacite)
+    ledger = Ledger()
+    ledger.attach(
+        libelles, colonnes['libelle_codes'], comptes, colonnes['compte_codes'],
+        colonnes['centimes'], lignes, totals
+    )
+    ledger.enregistrement = {
+        'chemin': chemin, 'lignes': lignes, 'capacite': capacite,
+        'tailles': (octets_comptes, octets_libelles), 'comptes': nb_comptes, 'libelles': nb_libelles,
+    }
+    return ledger, dividendes
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from engine import parse_centime, parse_centimes
+
+
+@pytest.mark.parametrize('texte, centimes', [
+    # Un seul séparateur, pas en groupes de milliers: décimal, arrondi au centime
+    ("0.005", 1),
+    ("3,14159", 314),
+    ("12.3456", 1235),
+    ("1000.125", 100013),
+    ("1234.567", 123457),
+    ("0,5", 50),
+    (".5", 50),
+    ("1.23.45", 12345),
+    # Groupes de 3 chiffres: milliers
+    ("1,234", 123400),
+    ("1.234", 123400),
+    ("1.234.567", 123456700),
+    ("1 234 567,89", 123456789),
+    # Les deux séparateurs: le dernier est décimal
+    ("1,234,567.89", 123456789),
+    ("1.234,56", 123456),
+    ("1.234,5", 123450),
+    ("1,234.5678", 123457),
+    # Exposant
+    ("1.5E+06", 150000000),
+    ("1e5", 10000000),
+    ("2.5e-1", 25),
+    ("-1.5e-2", -2),
+    # Signes et texte autour
+    ("(1 234)", -123400),
+    ("1 234-", -123400),
+    ("−12,30", -1230),
+    ("1 234,50 DA", 123450),
+    ("", 0),
+    ("abc", 0),
+    # Trop de chiffres: illisible
+    ("99999999999999999.5", 0),
+])
+def test_parse_centime(texte, centimes):
+    assert parse_centime(texte) == centimes
+
+
+def test_parse_centimes_decimal_connu():
+    assert parse_centimes(["1.234,5", "1,5", "0,005"], decimal=',').tolist() == [123450, 150, 1]
+    assert parse_centimes(["1,234.5", "2.5e3", "1.234"], decimal='.').tolist() == [123450, 250000, 123]
+
+
+def test_parse_centimes_colonnes_numeriques_et_mixtes():
+    assert parse_centimes(np.array([1, -2], dtype=np.int64)).tolist() == [100, -200]
+    assert parse_centimes([0.005, 1.5, float('nan')]).tolist() == [0, 150, 0]
+    assert parse_centimes([12.5, "1 000,25", None]).tolist() == [1250, 100025, 0]
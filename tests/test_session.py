@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from engine import CATEGORIES
+from ledger import Ledger
+from session import load_session, save_session
+
+
+def _ledger(n=2000):
+    ledger = Ledger()
+    comptes = np.array(['12', '681', '775', '601', '781'])[np.arange(n) % 5]
+    libelles = np.array(['Résultat', 'Dotation', 'Cession', 'Achat', 'Reprise'])[np.arange(n) % 5]
+    ledger.append(libelles, comptes, np.arange(n, dtype=np.int64) * 101)
+    return ledger
+
+
+def _contenu(ledger):
+    return [(ledger.libelle(i), ledger.compte(i), ledger.montant(i)) for i in range(len(ledger))]
+
+
+def test_aller_retour(tmp_path):
+    chemin = tmp_path / 'grand_livre.caf'
+    ledger = _ledger()
+    assert save_session(chemin, ledger, dividendes=12345) == 'complet'
+
+    relu, dividendes = load_session(chemin)
+    assert dividendes == 12345
+    assert _contenu(relu) == _contenu(ledger)
+    assert relu.category_totals().tolist() == ledger.category_totals().tolist()
+
+
+def test_enregistrement_incremental(tmp_path):
+    chemin = tmp_path / 'grand_livre.caf'
+    ledger = _ledger()
+    save_session(chemin, ledger)
+
+    # Modifications de lignes déjà enregistrées, nouveaux libellé et compte, lignes ajoutées
+    ledger.set_montant(3, 999_999)
+    ledger.set_libelle(10, 'Libellé inédit')
+    ledger.set_compte(11, '686')
+    ledger.append_row('Subvention virée', '777', 5000)
+    assert save_session(chemin, ledger, dividendes=700) == 'incrémental'
+
+    relu, dividendes = load_session(chemin)
+    assert dividendes == 700
+    assert _contenu(relu) == _contenu(ledger)
+    # Les totaux de l'en-tête sont ceux d'une passe complète
+    assert relu.category_totals().tolist() == ledger.recompute_totals().tolist()
+    assert relu.category_totals()[CATEGORIES.index('subventions')] == 5000
+
+
+def test_session_rouverte_puis_reenregistree(tmp_path):
+    chemin = tmp_path / 'grand_livre.caf'
+    save_session(chemin, _ledger())
+
+    # Une session ouverte (colonnes projetées en mémoire) s'enregistre sur elle-même
+    relu, _ = load_session(chemin)
+    relu.set_montant(0, -42)
+    relu.append_row('Ajout', '12', 1)
+    assert save_session(chemin, relu) == 'incrémental'
+    attendu = _contenu(relu)
+    del relu
+
+    rouvert, _ = load_session(chemin)
+    assert _contenu(rouvert) == attendu
+
+
+def test_depassement_de_capacite_reecrit_tout(tmp_path):
+    chemin = tmp_path / 'grand_livre.caf'
+    ledger = _ledger(10)
+    save_session(chemin, ledger)
+    ledger.append(['x'] * 5000, ['12'] * 5000, np.ones(5000, dtype=np.int64))
+    assert save_session(chemin, ledger) == 'complet'
+    assert _contenu(load_session(chemin)[0]) == _contenu(ledger)
+
+
+def test_fichier_non_session(tmp_path):
+    chemin = tmp_path / 'autre.caf'
+    chemin.write_bytes(b'pas une session')
+    with pytest.raises(ValueError):
+        load_session(chemin)
+
+
+def test_reecriture_complete_d_une_session_ouverte(tmp_path):
+    chemin = tmp_path / 'grand_livre.caf'
+    save_session(chemin, _ledger())
+
+    # Le fichier remplacé est celui que la session projette en mémoire
+    relu, _ = load_session(chemin)
+    relu.set_montant(1, 7)
+    relu.enregistrement = None
+    assert save_session(chemin, relu) == 'complet'
+    assert isinstance(relu.centimes, np.memmap) and relu.centimes.filename == str(chemin)
+
+    relu.set_montant(2, 8)
+    assert save_session(chemin, relu) == 'incrémental'
+    attendu = _contenu(relu)
+    del relu
+
+    rouvert, _ = load_session(chemin)
+    assert _contenu(rouvert) == attendu
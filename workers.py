@@ -0,0 +1,107 @@
+"""Exécution des traitements longs hors du thread de l'interface (QThreadPool)."""
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from instrumentation import instrumentation
+
+
+class Annulation(Exception):
+    pass
+
+
+class WorkerSignals(QObject):
+    # Émis depuis le thread de travail, reçus (en file d'attente) sur le thread de l'interface
+    progress = Signal(int, int, str)
+    chunk = Signal(object)
+    finished = Signal(object)
+    error = Signal(str, str)
+    cancelled = Signal()
+
+
+class Worker(QRunnable):
+    # fn(worker, *args) peut appeler worker.report(), worker.emit_chunk() et worker.check_cancelled()
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._annule = False
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self._annule = True
+
+    @property
+    def is_cancelled(self):
+        return self._annule
+
+    def check_cancelled(self):
+        if self._annule:
+            raise Annulation()
+
+    def report(self, fait, total=0, message=""):
+        self.check_cancelled()
+        self.signals.progress.emit(fait, total, message)
+
+    def emit_chunk(self, chunk):
+        self.check_cancelled()
+        self.signals.chunk.emit(chunk)
+
+    def run(self):
+        try:
+            with instrumentation.profiled():
+                resultat = self.fn(self, *self.args, **self.kwargs)
+        except Annulation:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e), traceback.format_exc())
+        else:
+            if self._annule:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(resultat)
+
+
+class LatestOnlyRunner(QObject):
+    # Au plus un traitement en cours et un seul en attente: une nouvelle demande
+    # remplace la précédente non démarrée, et le résultat d'un calcul devenu obsolète
+    # n'est jamais transmis.
+    finished = Signal(object)
+    error = Signal(str, str)
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._courant = None
+        self._en_attente = None
+
+    def submit(self, fn, *args, **kwargs):
+        self._en_attente = (fn, args, kwargs)
+        if self._courant is None:
+            self._start_next()
+        else:
+            self._courant.cancel()
+
+    def _start_next(self):
+        fn, args, kwargs = self._en_attente
+        self._en_attente = None
+        worker = Worker(fn, *args, **kwargs)
+        worker.signals.finished.connect(lambda resultat: self._done(worker, resultat))
+        worker.signals.error.connect(lambda message, details: self._done(worker, None, (message, details)))
+        worker.signals.cancelled.connect(lambda: self._done(worker, None))
+        self._courant = worker
+        self.pool.start(worker)
+
+    def _done(self, worker, resultat, erreur=None):
+        if worker is not self._courant:
+            return
+        self._courant = None
+        if self._en_attente is not None:
+            self._start_next()
+        elif erreur is not None:
+            self.error.emit(*erreur)
+        elif not worker.is_cancelled:
+            self.finished.emit(resultat)